@@ -3,11 +3,24 @@ from PySide6.QtWidgets import QApplication
 from window import Window
  
 import sys
+import argparse
 
 
 def main():           
-    app = QApplication()
-    win = Window()
+    parser = argparse.ArgumentParser(description="Pings multiple IP addresses simultaneously")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="serve Prometheus metrics at http://HOST:PORT/metrics")
+    parser.add_argument("--metrics-host", default="127.0.0.1", metavar="HOST",
+                        help="address to serve Prometheus metrics on, e.g. 0.0.0.0 to be scraped from other machines (default: %(default)s)")
+    parser.add_argument("--collector-port", type=int, metavar="PORT",
+                        help="collect the results of remote agents (pingagent.py) on PORT")
+    parser.add_argument("--collector-host", default="127.0.0.1", metavar="HOST",
+                        help="address to collect on, e.g. 0.0.0.0 for agents on other machines (default: %(default)s)")
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    win = Window(metricsPort=args.metrics_port, collectorPort=args.collector_port, metricsHost=args.metrics_host,
+                 collectorHost=args.collector_host)
     sys.exit(app.exec())
 
 if __name__ == "__main__":
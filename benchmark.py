@@ -0,0 +1,265 @@
+'''
+Benchmarks for Ping Tester's core, runnable without Qt.
+Run ```python benchmark.py``` on command line.
+'''
+from pingcore import Monitor, PingTarget, LatencyHistory
+from pingcore.exporter import MetricsExporter
+from pingcore.snapshot import packSnapshot, writeSnapshot, readSnapshot, iterSnapshot
+from pingcore.agent import Agent
+from pingcore.collector import Collector
+from pingcore import protocol
+
+import urllib.request
+import threading
+import asyncio
+import socket
+import tracemalloc
+import tempfile
+import random
+import time
+import sys
+import os
+
+
+def getTargets(count, pings=20):
+    targets = [PingTarget(row, f"10.{row >> 16 & 255}.{row >> 8 & 255}.{row & 255}") for row in range(count)]
+    for target in targets:
+        for n in range(pings):
+            if n % 3:
+                target.update([time.time(), 10 + n, 30 + n, 20 + n])
+            else:
+                target.update(["Request timed out"])
+
+    return targets
+
+
+def benchmarkTargetMemory(counts=(1000, 10000, 100000)):
+    print("Per-target memory (PingTarget state after 20 pings)")
+    for count in counts:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+
+        targets = getTargets(count)
+
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # The round trip time histogram only the metrics exporter reads
+        counters = sum(sys.getsizeof(target.rttCounts) for target in targets if target.rttCounts is not None)
+        print(f"  {count:>7} targets: {(after - before) / count:8.1f} bytes/target, "
+              f"{(after - before - counters) / count:8.1f} without the exporter's rttCounts")
+        del targets
+
+
+def benchmarkSnapshot(count=10000):
+    print(f"Session snapshot of {count} targets")
+    targets = getTargets(count)
+    restored = [PingTarget(target.key, target.ip_address) for target in targets]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "session.snapshot")
+
+        start = time.perf_counter()
+        data = packSnapshot(targets)
+        packed = time.perf_counter()
+        writeSnapshot(path, data)
+        written = time.perf_counter()
+
+        data = readSnapshot(path)
+        for target, (name, ip_address, state) in zip(restored, iterSnapshot(data)):
+            target.restore(state)
+        restoredTime = time.perf_counter()
+
+    print(f"  pack:    {(packed - start) * 1000:8.2f} ms ({len(data)} bytes)")
+    print(f"  write:   {(written - packed) * 1000:8.2f} ms")
+    print(f"  restore: {(restoredTime - written) * 1000:8.2f} ms")
+
+
+def benchmarkDecimation(counts=(10000, 100000, 1000000), width=800):
+    print(f"Chart decimation to {width} px (full redraw / 1 new column, history memory)")
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    empty = [LatencyHistory() for _ in range(1000)]
+    print(f"  {0:>8} samples: {(tracemalloc.get_traced_memory()[0] - before) / len(empty):8.1f} bytes")
+    tracemalloc.stop()
+
+    for count in counts:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        history = LatencyHistory()
+        for n in range(count):
+            history.append(n * 0.5, None if random.random() < 0.02 else random.uniform(5, 300))
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+
+        spp = count * 0.5 / width
+        start = time.perf_counter()
+        history.columns(0, width * spp, width)
+        full = time.perf_counter()
+        history.columns((width - 1) * spp, width * spp, 1)
+        incremental = time.perf_counter()
+
+        print(f"  {count:>8} samples: {(full - start) * 1000:8.2f} ms / {(incremental - full) * 1000:6.3f} ms, {memory / 1024:7.1f} KiB")
+
+
+def fakeProbe(ip_address):
+    return [time.time(), 10, 30, 20]
+
+
+def benchmarkStream(targetCount=1000, duration=2.0):
+    print(f"Monitor result streaming ({targetCount} targets, instant probe)")
+    for batchSize in (None, 1000):
+        monitor = Monitor(interval=0, maxWorkers=4, probe=fakeProbe)
+        for n in range(targetCount):
+            monitor.addTarget(f"10.0.{n >> 8 & 255}.{n & 255}")
+
+        stream = monitor.stream(batchSize=batchSize)
+        monitor.start()
+        received = 0
+        start = time.perf_counter()
+        for item in stream:
+            received += 1 if batchSize is None else len(item)
+            if monitor.running and time.perf_counter() - start >= duration:
+                monitor.stop()
+        elapsed = time.perf_counter() - start
+
+        label = "single results" if batchSize is None else f"batches of {batchSize}"
+        print(f"  {label:>18}: {received / elapsed:10.0f} results/s")
+
+
+def benchmarkScrape(count=10000, scrapes=10):
+    print(f"Metrics scrape of {count} targets over HTTP")
+    targets = getTargets(count)
+    monitor = Monitor()
+    for target in targets:
+        monitor.addTarget(target)
+
+    exporter = MetricsExporter(monitor, port=0)
+    start = time.perf_counter()
+    exporter.start()
+    print(f"  start, making the templates:         {(time.perf_counter() - start) * 1000:6.2f} ms")
+    url = f"http://127.0.0.1:{exporter.port}/metrics"
+    try:
+        start = time.perf_counter()
+        body = urllib.request.urlopen(url).read()
+        print(f"  first scrape:                        {(time.perf_counter() - start) * 1000:6.2f} ms ({len(body)} bytes)")
+
+        for changed in (0.15, 1.0):
+            timings = list()
+            for _ in range(scrapes):
+                # Ping a share of the targets between two scrapes
+                for target in random.sample(targets, int(count * changed)):
+                    target.update([time.time(), 10, 30, random.randint(10, 30)])
+
+                start = time.perf_counter()
+                body = urllib.request.urlopen(url).read()
+                timings.append(time.perf_counter() - start)
+
+            print(f"  {changed:4.0%} of targets pinged between scrapes: median {sorted(timings)[len(timings) // 2] * 1000:6.2f} ms ({len(body)} bytes)")
+    finally:
+        exporter.stop()
+
+
+def sendFrames(port, agentId, declarations, frames):
+    # A minimal agent replaying pre-encoded frames, so that only the Collector is measured
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        reader = sock.makefile("rb")
+
+        def readFrame():
+            frameType, length = protocol.HEADER.unpack(reader.read(protocol.HEADER.size))
+            return frameType, reader.read(length)
+
+        sock.sendall(protocol.helloFrame(random.getrandbits(64), agentId))
+        _, window = protocol.WELCOME_PAYLOAD.unpack(readFrame()[1])
+        sock.sendall(declarations)
+
+        acked = 0
+        for sequence, frame in enumerate(frames, 1):
+            while sequence > acked + window:
+                acked = protocol.SEQUENCE.unpack(readFrame()[1])[0]
+            sock.sendall(frame)
+        while acked < len(frames):
+            acked = protocol.SEQUENCE.unpack(readFrame()[1])[0]
+
+
+def benchmarkCollector(agentCount=4, frameCount=250, batchSize=1000, targetCount=1000):
+    total = agentCount * frameCount * batchSize
+    print(f"Collector throughput ({agentCount} agents over localhost, {total} results in frames of {batchSize})")
+    results = [PingTarget(n, f"10.0.{n >> 8 & 255}.{n & 255}").update(fakeProbe(None)) for n in range(targetCount)]
+    declarations = b"".join(protocol.targetFrame(n + 1, str(n), result.ip_address) for n, result in enumerate(results))
+    records = [protocol.packRecord(n % targetCount + 1, 0, results[n % targetCount]) for n in range(batchSize)]
+    frames = [protocol.encodeResults(sequence, b"".join(records)) for sequence in range(1, frameCount + 1)]
+
+    collector = Collector(port=0)
+    collector.start()
+    stream = collector.stream(batchSize=10000)
+    try:
+        start = time.perf_counter()
+        senders = [threading.Thread(target=sendFrames, args=(collector.port, f"agent-{n}", declarations, frames))
+                   for n in range(agentCount)]
+        for sender in senders:
+            sender.start()
+
+        received = 0
+        while received < total:
+            received += len(next(stream))
+        elapsed = time.perf_counter() - start
+        for sender in senders:
+            sender.join()
+    finally:
+        collector.stop()
+
+    print(f"  {received / elapsed:10.0f} results/s received and streamed")
+
+
+def benchmarkAgents(agentCount=4, targetCount=1000, duration=2.0):
+    print(f"Agents to Collector end to end ({agentCount} agents of {targetCount} targets, instant probe)")
+    collector = Collector(port=0)
+    collector.start()
+    stream = collector.stream(batchSize=10000)
+
+    monitors = list()
+    agents = list()
+    threads = list()
+    for n in range(agentCount):
+        monitor = Monitor(interval=0, maxWorkers=2, probe=fakeProbe)
+        for i in range(targetCount):
+            monitor.addTarget(f"10.{n}.{i >> 8 & 255}.{i & 255}")
+        agent = Agent(monitor, port=collector.port, agentId=f"agent-{n}")
+        monitors.append(monitor)
+        agents.append(agent)
+        threads.append(threading.Thread(target=asyncio.run, args=(agent.run(),)))
+
+    start = time.perf_counter()
+    for monitor, thread in zip(monitors, threads):
+        monitor.start()
+        thread.start()
+
+    received = 0
+    for batch in stream:
+        received += len(batch)
+        if time.perf_counter() - start >= duration:
+            break
+    elapsed = time.perf_counter() - start
+
+    for monitor in monitors:
+        monitor.stop()
+    for thread in threads:
+        thread.join()
+    collector.stop()
+
+    pinged = sum(monitor.dispatched for monitor in monitors)
+    print(f"  {received / elapsed:10.0f} results/s received ({pinged} pinged, {collector.received} received in total)")
+
+
+def main():
+    benchmarkTargetMemory()
+    benchmarkSnapshot()
+    benchmarkDecimation()
+    benchmarkStream()
+    benchmarkScrape()
+    benchmarkCollector()
+    benchmarkAgents()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+from PySide6.QtWidgets import QWidget, QSizePolicy
+from PySide6.QtGui import QPainter, QPixmap, QColor, QPen
+from PySide6.QtCore import Qt, QTimer, QRect
+
+import math
+import time
+
+
+class LatencyChart(QWidget):
+    '''
+    Live round trip time chart of one or more targets.
+
+    Every pixel column shows the min/max of the samples which fall into it,
+    read from the targets' LatencyHistory aggregates, so the cost of a redraw
+    depends on the width of the chart rather than on the length of the history.
+    Columns are aligned to absolute time, which lets the cached plot be scrolled
+    on refresh so that only the columns of newly arrived samples are drawn.
+
+    Scroll the mouse wheel to zoom, drag to pan and double-click to follow
+    the latest samples again.
+    '''
+
+    COLORS = [QColor(31, 119, 180), QColor(255, 127, 14), QColor(44, 160, 44),
+              QColor(148, 103, 189), QColor(140, 86, 75), QColor(227, 119, 194)]
+    LOST_COLOR = QColor("red")
+
+    MARGIN_LEFT = 60
+    MARGIN_RIGHT = 10
+    MARGIN_TOP = 10
+    MARGIN_BOTTOM = 25
+
+    REFRESH_INTERVAL = 1000     # in milliseconds
+    MIN_SPAN = 15               # in seconds
+    MAX_SPAN = 7 * 24 * 3600    # in seconds
+
+    def __init__(self):
+        super().__init__()
+        self.setMinimumWidth(300)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+        self.targets = list()
+        self.span = 600.0       # visible time range, in seconds
+        self.end = None         # timestamp of the right edge, None to follow the latest samples
+        self.yMax = 100         # in milliseconds
+
+        self.canvas = None
+        self.canvasKey = None
+        self.canvasEndColumn = None
+        self.dragX = None
+
+        self.refreshTimer = QTimer(self)
+        self.refreshTimer.timeout.connect(self.refresh)
+        self.refreshTimer.start(self.REFRESH_INTERVAL)
+
+    def setTargets(self, targets):
+        '''
+        targets: list
+            (name, PingTarget) pairs to overlay, up to len(COLORS)
+        '''
+        self.targets = targets[:len(self.COLORS)]
+        self.canvasKey = None
+        self.update()
+
+    def refresh(self):
+        if self.targets and self.end is None and self.isVisible():
+            self.update()
+
+    def plotRect(self):
+        return self.rect().adjusted(self.MARGIN_LEFT, self.MARGIN_TOP, -self.MARGIN_RIGHT, -self.MARGIN_BOTTOM)
+
+    def secondsPerPixel(self):
+        return self.span / max(self.plotRect().width(), 1)
+
+    def endTime(self):
+        return time.time() if self.end is None else self.end
+
+    def fetchColumns(self, firstColumn, lastColumn, spp):
+        '''
+        Returns the decimated columns of every target between two absolute column indexes
+        '''
+        width = lastColumn - firstColumn + 1
+        result = list()
+        for _, target in self.targets:
+            history = target.history
+            if history is None or len(history) == 0:
+                result.append([None] * width)
+            else:
+                result.append(history.columns(firstColumn * spp, (lastColumn + 1) * spp, width))
+
+        return result
+
+    def highestRtt(self, columns):
+        highest = 0
+        for series in columns:
+            for column in series:
+                if column is not None and column[1] > highest:
+                    highest = column[1]
+
+        return highest
+
+    def niceYMax(self, rtt):
+        # Round up to 1, 2 or 5 times a power of ten, with some headroom
+        rtt = max(rtt * 1.1, 10)
+        magnitude = 10 ** math.floor(math.log10(rtt))
+        for step in (1, 2, 5, 10):
+            if step * magnitude >= rtt:
+                return step * magnitude
+
+    def updateCanvas(self):
+        rect = self.plotRect()
+        width, height = rect.width(), rect.height()
+        if width <= 0 or height <= 0:
+            return
+
+        spp = self.secondsPerPixel()
+        endColumn = math.floor(self.endTime() / spp)
+        key = (width, height, self.span, tuple(id(target.history) for _, target in self.targets))
+
+        shift = None if self.canvasEndColumn is None else endColumn - self.canvasEndColumn
+        if key == self.canvasKey and shift is not None and abs(shift) < width:
+            # Only draw the columns which scrolled into view, plus the last drawn
+            # column when following the latest samples as it may have grown since
+            if shift >= 0:
+                firstColumn = self.canvasEndColumn if self.end is None else self.canvasEndColumn + 1
+                lastColumn = endColumn
+            else:
+                firstColumn = endColumn - width + 1
+                lastColumn = firstColumn - shift - 1
+
+            if firstColumn > lastColumn:
+                return
+
+            columns = self.fetchColumns(firstColumn, lastColumn, spp)
+            if self.highestRtt(columns) <= self.yMax:
+                self.canvas.scroll(-shift, 0, self.canvas.rect())
+                self.canvasEndColumn = endColumn
+                self.drawColumns(columns, firstColumn, endColumn - width + 1, height)
+                return
+
+        # Full redraw
+        firstColumn = endColumn - width + 1
+        columns = self.fetchColumns(firstColumn, endColumn, spp)
+        self.yMax = self.niceYMax(self.highestRtt(columns))
+
+        self.canvas = QPixmap(width, height)
+        self.canvas.fill(self.palette().base().color())
+        self.canvasKey = key
+        self.canvasEndColumn = endColumn
+        self.drawColumns(columns, firstColumn, firstColumn, height)
+
+    def drawColumns(self, columns, firstColumn, leftColumn, height):
+        '''
+        Draws columns starting at absolute column firstColumn, where leftColumn
+        is the absolute column at the left edge of the canvas
+        '''
+        x0 = firstColumn - leftColumn
+        painter = QPainter(self.canvas)
+        painter.fillRect(QRect(x0, 0, len(columns[0]) if columns else 0, height), self.palette().base())
+
+        scale = (height - 1) / self.yMax
+        for color, series in zip(self.COLORS, columns):
+            pen = QPen(color)
+            lostPen = QPen(self.LOST_COLOR)
+            for x, column in enumerate(series, x0):
+                if column is None:
+                    continue
+
+                low, high, lost = column
+                if lost:
+                    painter.setPen(lostPen)
+                    painter.drawLine(x, 0, x, 2)
+                if high >= low:
+                    painter.setPen(pen)
+                    painter.drawLine(x, round(height - 1 - low * scale), x, round(height - 1 - high * scale))
+
+        painter.end()
+
+    def paintEvent(self, event):
+        self.updateCanvas()
+
+        painter = QPainter(self)
+        rect = self.plotRect()
+        painter.fillRect(self.rect(), self.palette().window())
+        if self.canvas is not None and rect.width() > 0 and rect.height() > 0:
+            painter.drawPixmap(rect.topLeft(), self.canvas)
+
+        painter.setPen(self.palette().text().color())
+        painter.drawRect(rect.adjusted(0, 0, -1, -1))
+
+        # Y axis
+        for fraction in (0, 0.5, 1):
+            y = round(rect.bottom() - fraction * (rect.height() - 1))
+            label = f"{self.yMax * fraction:g} ms"
+            painter.drawText(QRect(0, y - 10, self.MARGIN_LEFT - 5, 20), Qt.AlignRight | Qt.AlignVCenter, label)
+
+        # X axis
+        end = self.endTime()
+        timeFormat = "%H:%M:%S" if self.span < 24 * 3600 else "%d/%m %H:%M"
+        labelRect = QRect(rect.left(), rect.bottom() + 3, rect.width(), self.MARGIN_BOTTOM - 3)
+        painter.drawText(labelRect, Qt.AlignLeft, time.strftime(timeFormat, time.localtime(end - self.span)))
+        painter.drawText(labelRect, Qt.AlignRight, "Live" if self.end is None else time.strftime(timeFormat, time.localtime(end)))
+        painter.drawText(labelRect, Qt.AlignHCenter, self.formatSpan())
+
+        # Legend
+        for i, (name, _) in enumerate(self.targets):
+            painter.setPen(self.COLORS[i])
+            painter.drawText(rect.left() + 5, rect.top() + 15 * (i + 1), name)
+
+        painter.end()
+
+    def formatSpan(self):
+        if self.span < 120:
+            return f"{self.span:g} s"
+        if self.span < 7200:
+            return f"{self.span / 60:g} min"
+        if self.span < 2 * 24 * 3600:
+            return f"{self.span / 3600:g} h"
+        return f"{self.span / (24 * 3600):g} days"
+
+    def wheelEvent(self, event):
+        if event.angleDelta().y() > 0:
+            self.span = max(self.span / 2, self.MIN_SPAN)
+        else:
+            self.span = min(self.span * 2, self.MAX_SPAN)
+        self.update()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self.dragX = event.position().x()
+
+    def mouseMoveEvent(self, event):
+        if self.dragX is None:
+            return
+
+        x = event.position().x()
+        end = self.endTime() - (x - self.dragX) * self.secondsPerPixel()
+        self.end = None if end >= time.time() else end
+        self.dragX = x
+        self.update()
+
+    def mouseReleaseEvent(self, event):
+        self.dragX = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.end = None
+        self.update()
@@ -0,0 +1,37 @@
+from PySide6.QtCore import QRunnable
+
+from pingthreadsignals import PingThreadSignals
+
+
+class MonitorBridge(QRunnable):
+    '''
+    Thread which forwards the results of a pingcore Monitor or Collector to the GUI thread.
+    monitor: Monitor or Collector
+        Source of the results to be forwarded; it must not have been started yet
+
+    Results are forwarded in batches so that the GUI thread is woken up at
+    most once every BATCH_DELAY seconds, however many targets are pinged.
+    '''
+
+    BATCH_SIZE = 1000
+    BATCH_DELAY = 0.05  # in seconds
+
+    def __init__(self, monitor):
+        super().__init__()
+
+        self.monitor = monitor
+        self.signals = PingThreadSignals()
+
+        # Subscribe before the Monitor starts so that no result is missed
+        self.stream = monitor.stream(batchSize=self.BATCH_SIZE, maxDelay=self.BATCH_DELAY)
+
+    def run(self):
+        self.signals.started.emit()
+
+        for batch in self.stream:
+            for result in batch:
+                if result.error is not None:
+                    self.signals.error.emit(result)
+            self.signals.result.emit(batch)
+
+        self.signals.finished.emit()
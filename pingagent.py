@@ -0,0 +1,49 @@
+from pingcore import Monitor
+from pingcore.agent import Agent
+
+import os
+import json
+import asyncio
+import argparse
+
+
+def getServers(path):
+    with open(path) as json_file:
+        return list(json.load(json_file).items())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pings IP addresses and streams the results to a Ping Tester collector")
+    parser.add_argument("--collector", default="127.0.0.1:9109", metavar="HOST:PORT",
+                        help="address of the Ping Tester started with --collector-port (default: %(default)s)")
+    parser.add_argument("--id", dest="agentId", metavar="NAME",
+                        help="name shown in the Agent column (default: host name)")
+    parser.add_argument("--interval", type=float, default=0.5, metavar="SECONDS",
+                        help="delay between two pings of a target (default: %(default)s)")
+    parser.add_argument("targets", nargs="*", metavar="IP",
+                        help="IP addresses to ping (default: the servers of server_list.json)")
+    args = parser.parse_args()
+
+    host, _, port = args.collector.rpartition(":")
+    if args.targets:
+        servers = [(ip_address, ip_address) for ip_address in args.targets]
+    else:
+        servers = getServers(os.path.join(os.path.dirname(os.path.realpath(__file__)), "server_list.json"))
+
+    monitor = Monitor(interval=args.interval)
+    for name, ip_address in servers:
+        monitor.addTarget(ip_address, key=name)
+
+    agent = Agent(monitor, host or "127.0.0.1", int(port), agentId=args.agentId)
+    monitor.start()
+    try:
+        asyncio.run(agent.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.stop()
+        agent.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+'''
+Qt-free core of Ping Tester, for embedding in other Python programs.
+
+    from pingcore import Monitor
+
+    monitor = Monitor(interval=0.5)
+    monitor.addTarget("8.8.8.8")
+    monitor.addTarget("1.1.1.1", key="cloudflare")
+    stream = monitor.stream()
+    monitor.start()
+
+    for result in stream:
+        print(result.key, result.rtt, result.successRate)
+
+Results are PingResult records. From an asyncio loop, use
+```async for result in monitor.stream()``` instead; pass batchSize (and
+optionally maxDelay) to stream() to receive lists of results, which is
+much cheaper at thousands of results per second. Targets may be added
+and removed with addTarget() and removeTarget() while the Monitor runs.
+stop() ends the open streams once the pings in progress have been
+delivered; a stream opened before start(), including after a stop(),
+gets every result of the next run.
+
+To expose the measurements to Prometheus:
+
+    from pingcore.exporter import MetricsExporter
+
+    exporter = MetricsExporter(monitor, port=9108)
+    exporter.start()        # serves http://127.0.0.1:9108/metrics
+
+To ping from several places and watch the results in one place, run an
+Agent next to each Monitor and a Collector where the results are wanted:
+
+    from pingcore.agent import Agent
+    from pingcore.collector import Collector
+
+    collector = Collector(port=9109)
+    collector.start()
+    for result in collector.stream():
+        print(result.agent, result.key, result.rtt)
+
+    # on each agent's machine, creating the Agent before starting its Monitor
+    agent = Agent(monitor, "collector-host", 9109, agentId="paris")
+    monitor.start()
+    asyncio.run(agent.run())
+
+Agents resend whatever the Collector has not acknowledged after a
+reconnect, so results are neither lost nor repeated while the Agent keeps
+running, and they slow down while the Collector's consumers fall behind.
+'''
+from .monitor import Monitor
+from .stream import ResultStream
+from .records import PingResult
+from .target import PingTarget, formatResponseTime
+from .history import LatencyHistory
+from .probe import ping
@@ -0,0 +1,222 @@
+from . import protocol
+
+from collections import deque
+import asyncio
+import random
+import socket
+
+
+class Agent:
+    '''
+    Headless probe agent which streams the results of a Monitor to a Collector.
+    monitor: Monitor
+        Monitor whose results are sent; it is not started or stopped by the Agent
+
+    host, port: str, int
+        Address of the Collector
+
+    agentId: str
+        Name of this vantage point, defaults to the host name
+
+    batchSize, maxDelay: int, float
+        Results are sent in frames of up to batchSize results, waiting up to
+        maxDelay seconds for a frame to fill up
+
+    maxBuffered: int
+        Frames kept while the Collector is unreachable or slow; once reached,
+        results wait in the Monitor's stream, which drops the oldest
+
+    reconnectDelay: float
+        Seconds to wait before connecting again after the connection is lost
+
+    Results are sent from the Agent's creation on, so create it before
+    starting the Monitor. run() reconnects until stop() is called, or the
+    Monitor stops and every result has been acknowledged.
+    '''
+
+    def __init__(self, monitor, host="127.0.0.1", port=9109, agentId=None,
+                 batchSize=1000, maxDelay=0.05, maxBuffered=1024, reconnectDelay=1.0):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.agentId = agentId if agentId is not None else socket.gethostname()
+        self.batchSize = batchSize
+        self.maxDelay = maxDelay
+        self.maxBuffered = maxBuffered
+        self.reconnectDelay = reconnectDelay
+
+        self.session = random.getrandbits(64)
+        self.sequence = 0
+        self.acked = 0
+        self.window = 1
+        self.unacked = deque()      # (sequence number, frames) not acknowledged yet
+
+        # Ids of the targets and messages declared so far, and their frames,
+        # which are sent again on every new connection
+        self.targetIds = dict()
+        self.messageIds = dict()
+        self.declarations = list()
+
+        self.connected = False
+        self.stopped = False
+        self.pumpDone = False
+        self.loop = None            # of run(), while it runs
+        self.wakeup = None          # set when there is something to send
+        self.space = None           # set when acknowledged frames were dropped
+
+        # Subscribed now so that results published before run(), e.g. from
+        # monitor.start(), are sent too
+        self.stream = monitor.stream(batchSize=batchSize, maxDelay=maxDelay)
+
+    def stop(self):
+        '''
+        Stops run(); may be called from any thread
+        '''
+        self.stopped = True
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+
+        try:
+            loop.call_soon_threadsafe(self.wakeup.set)
+            loop.call_soon_threadsafe(self.space.set)
+        except RuntimeError:
+            # The loop closed in the meantime, and run() with it
+            pass
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.space = asyncio.Event()
+        pump = asyncio.create_task(self.pump(self.stream))
+
+        try:
+            while not self.isDone():
+                try:
+                    await self.connect()
+                except (OSError, EOFError, asyncio.IncompleteReadError, protocol.ProtocolError):
+                    pass
+                self.connected = False
+
+                if self.isDone():
+                    break
+                await self.sleep(self.reconnectDelay)
+        finally:
+            pump.cancel()
+            self.stream.close()
+            self.loop = None
+
+    def isDone(self):
+        return self.stopped or (self.pumpDone and not self.unacked)
+
+    async def sleep(self, delay):
+        # Sleeps unless stopped in the meantime
+        deadline = self.loop.time() + delay
+        while not self.stopped and self.loop.time() < deadline:
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), deadline - self.loop.time())
+            except asyncio.TimeoutError:
+                pass
+
+    async def pump(self, stream):
+        '''
+        Encodes the Monitor's results into frames waiting to be sent
+        '''
+        async for batch in stream:
+            while len(self.unacked) >= self.maxBuffered and not self.stopped:
+                self.space.clear()
+                await self.space.wait()
+            if self.stopped:
+                break
+
+            self.sequence += 1
+            self.unacked.append((self.sequence, self.encode(batch)))
+            self.wakeup.set()
+
+        self.pumpDone = True
+        self.wakeup.set()
+
+    def encode(self, batch):
+        declarations = list()
+        records = list()
+        for result in batch:
+            key = str(result.key)
+            targetId = self.targetIds.get(key)
+            if targetId is None:
+                targetId = self.targetIds[key] = len(self.targetIds) + 1
+                declarations.append(protocol.targetFrame(targetId, key, result.ip_address))
+
+            messageId = 0
+            if result.message is not None:
+                messageId = self.messageIds.get(result.message)
+                if messageId is None:
+                    messageId = self.messageIds[result.message] = len(self.messageIds) + 1
+                    declarations.append(protocol.messageFrame(messageId, result.message))
+
+            records.append(protocol.packRecord(targetId, messageId, result))
+
+        self.declarations.extend(declarations)
+        declarations.append(protocol.encodeResults(self.sequence, b"".join(records)))
+        return b"".join(declarations)
+
+    async def connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(protocol.helloFrame(self.session, self.agentId))
+            frameType, payload = await protocol.readFrame(reader)
+            if frameType != protocol.WELCOME:
+                raise protocol.ProtocolError(f"Expected WELCOME, got frame type {frameType}")
+
+            acked, self.window = protocol.parseWelcome(payload)
+            self.acknowledge(acked)
+            self.connected = True
+
+            # Declarations are per connection on the Collector side
+            writer.write(b"".join(self.declarations))
+            await self.send(reader, writer)
+        finally:
+            writer.close()
+
+    async def send(self, reader, writer):
+        acks = asyncio.create_task(self.readAcks(reader))
+        nextSequence = self.unacked[0][0] if self.unacked else self.sequence + 1
+
+        try:
+            while not self.isDone():
+                self.wakeup.clear()
+
+                # Send every pending frame the window allows
+                while self.unacked and nextSequence <= self.acked + self.window:
+                    index = max(nextSequence - self.unacked[0][0], 0)
+                    if index >= len(self.unacked):
+                        break
+                    sequence, frames = self.unacked[index]
+                    writer.write(frames)
+                    nextSequence = sequence + 1
+                await writer.drain()
+
+                if acks.done():
+                    acks.result()
+                    raise EOFError("Collector closed the connection")
+
+                waiter = asyncio.create_task(self.wakeup.wait())
+                await asyncio.wait([waiter, acks], return_when=asyncio.FIRST_COMPLETED)
+                waiter.cancel()
+        finally:
+            acks.cancel()
+
+    async def readAcks(self, reader):
+        while True:
+            frameType, payload = await protocol.readFrame(reader)
+            if frameType != protocol.ACK:
+                raise protocol.ProtocolError(f"Expected ACK, got frame type {frameType}")
+
+            self.acknowledge(protocol.parseSequence(payload))
+            self.wakeup.set()
+
+    def acknowledge(self, sequence):
+        self.acked = max(self.acked, sequence)
+        while self.unacked and self.unacked[0][0] <= self.acked:
+            self.unacked.popleft()
+        self.space.set()
@@ -0,0 +1,198 @@
+from . import protocol
+from .stream import ResultPublisher
+
+import asyncio
+import threading
+
+
+class RemoteAgent:
+    '''
+    What the Collector knows about an agent's current session
+    '''
+
+    __slots__ = ("agentId", "session", "lastSequence", "targets", "messages", "writer",
+                 "received", "connections")
+
+    def __init__(self, agentId, session):
+        self.agentId = agentId
+        self.session = session
+        self.lastSequence = 0
+        self.targets = dict()       # target id -> (key, ip_address)
+        self.messages = dict()      # message id -> text
+        self.writer = None
+        self.received = 0
+        self.connections = 0
+
+
+class Collector(ResultPublisher):
+    '''
+    Receives the results of remote Agents and streams them like a Monitor,
+    with each result's agent set to the Agent's id. Serves from an asyncio
+    loop on a background thread.
+    host: str
+        Address to listen on
+
+    port: int
+        Port to listen on, 0 for any free port; the port in use is set on start()
+
+    window: int
+        Frames an Agent may send before waiting for their acknowledgement
+
+    highWater: float
+        Share of a stream's maxQueue above which acknowledgements are held
+        back, so that Agents stop sending until its consumer catches up. An
+        Agent may still send window frames after that, which must fit in
+        the rest of the queue not to be dropped
+    '''
+
+    def __init__(self, host="127.0.0.1", port=9109, window=32, highWater=0.5):
+        self.host = host
+        self.port = port
+        self.window = window
+        self.highWater = highWater
+        super().__init__()
+
+        self.agents = dict()
+        self.received = 0
+        self.duplicates = 0
+
+        self.loop = None
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        ready = threading.Event()
+        self.thread = threading.Thread(target=self.serve, args=(ready,), name="pingcore-collector", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+        if self.server is None:
+            self.thread.join()
+            raise OSError(f"Could not listen on {self.host}:{self.port}")
+
+    def stop(self):
+        '''
+        Stops serving and ends the streams open now
+        '''
+        if self.loop is None:
+            return
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.thread = None
+
+    def serve(self, ready):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            try:
+                self.server = self.loop.run_until_complete(
+                    asyncio.start_server(self.handle, self.host, self.port))
+                self.port = self.server.sockets[0].getsockname()[1]
+            finally:
+                ready.set()
+
+            self.loop.run_forever()
+
+            self.server.close()
+            for agent in self.agents.values():
+                if agent.writer is not None:
+                    agent.writer.close()
+
+            # Connections end by themselves once closed; cancel those which do not
+            tasks = asyncio.all_tasks(self.loop)
+            if tasks:
+                _, pending = self.loop.run_until_complete(asyncio.wait(tasks, timeout=1))
+                for task in pending:
+                    task.cancel()
+                self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        finally:
+            self.loop.close()
+            self.loop = None
+            self.server = None
+            self.closeStreams()
+
+    def statistics(self):
+        '''
+        Returns the Collector's own statistics:
+            agents          agents which connected since the Collector started
+            connected       agents connected now
+            received        results received
+            duplicates      results received again after a reconnect, and ignored
+            queued          results waiting in streams for their consumers
+            dropped         results dropped by streams whose consumers fell behind
+        '''
+        agents = list(self.agents.values())
+        streams = self.streams
+        return {
+            "agents": len(agents),
+            "connected": sum(1 for agent in agents if agent.writer is not None),
+            "received": self.received,
+            "duplicates": self.duplicates,
+            "queued": sum(len(stream.queue) for stream in streams),
+            "dropped": sum(stream.dropped for stream in streams),
+        }
+
+    async def handle(self, reader, writer):
+        agent = None
+        try:
+            frameType, payload = await protocol.readFrame(reader)
+            if frameType != protocol.HELLO:
+                raise protocol.ProtocolError(f"Expected HELLO, got frame type {frameType}")
+
+            agent = self.welcome(*protocol.parseHello(payload), writer)
+            await self.receive(agent, reader, writer)
+        except (OSError, asyncio.IncompleteReadError, protocol.ProtocolError):
+            pass
+        finally:
+            if agent is not None and agent.writer is writer:
+                agent.writer = None
+            writer.close()
+
+    def welcome(self, session, agentId, writer):
+        agent = self.agents.get(agentId)
+        if agent is None or agent.session != session:
+            # First connection of this session, e.g. the agent restarted
+            agent = self.agents[agentId] = RemoteAgent(agentId, session)
+        elif agent.writer is not None:
+            # Replaces a connection the agent gave up on
+            agent.writer.close()
+
+        agent.writer = writer
+        agent.connections += 1
+        writer.write(protocol.welcomeFrame(agent.lastSequence, self.window))
+        return agent
+
+    async def receive(self, agent, reader, writer):
+        while agent.writer is writer:
+            frameType, payload = await protocol.readFrame(reader)
+
+            if frameType == protocol.RESULTS:
+                sequence = protocol.parseSequence(payload)
+                if sequence <= agent.lastSequence:
+                    # Sent again after a reconnect, before the agent knew it arrived
+                    self.duplicates += (len(payload) - protocol.SEQUENCE.size) // protocol.RECORD.size
+                else:
+                    _, results = protocol.decodeResults(payload, agent.targets, agent.messages, agent.agentId)
+                    self.publishMany(results)
+                    agent.lastSequence = sequence
+                    agent.received += len(results)
+                    self.received += len(results)
+
+                    # Holding back the acknowledgement stops the agent once its window is used up
+                    while self.queueFill() > self.highWater and not writer.is_closing():
+                        await asyncio.sleep(0.01)
+
+                writer.write(protocol.ackFrame(agent.lastSequence))
+                await writer.drain()
+
+            elif frameType == protocol.TARGET:
+                targetId, key, ip_address = protocol.parseTarget(payload)
+                agent.targets[targetId] = (key, ip_address)
+
+            elif frameType == protocol.MESSAGE:
+                messageId, text = protocol.parseMessage(payload)
+                agent.messages[messageId] = text
+
+            else:
+                raise protocol.ProtocolError(f"Unexpected frame type {frameType}")
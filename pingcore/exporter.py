@@ -0,0 +1,232 @@
+from .target import PingTarget
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from itertools import accumulate
+import functools
+import threading
+import time
+
+
+class MetricsExporter:
+    '''
+    Serves the metrics of a Monitor over HTTP at /metrics, in the Prometheus
+    text exposition format, from a background thread.
+    monitor: Monitor
+        Monitor whose metrics are served; may be replaced at any time
+
+    host: str
+        Address to listen on, e.g. 0.0.0.0 to be scraped from other machines
+
+    port: int
+        Port to listen on, 0 for any free port; the port in use is set on start()
+
+    names: callable
+        Returns the target label of a target's key, e.g. its server name; by
+        default the key itself. It must return the same name for a key
+
+    Series are labelled with the target's name; pingcore_target_info maps it
+    to the IP Address, so join on it to label other series by IP Address.
+
+    A scrape only reads the counters the Monitor and its targets keep up to
+    date anyway, so it costs O(targets) and never blocks a ping. Each target's
+    lines are formatted from byte templates made once per key, and kept until
+    the target is pinged again, so a scrape mostly joins cached bytes. The
+    templates of the targets there already are made when the server starts.
+    '''
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+    EMPTY_HISTOGRAM = (0,) * (len(PingTarget.RTT_BUCKETS) + 1)
+
+    # Per target templates of the histogram, probes, lost and loss ratio lines,
+    # with LABELS standing for the target's label set
+    LABELS = "{LABELS}"
+    TEMPLATES = (
+        "".join([f'pingcore_target_rtt_seconds_bucket{{LABELS}},le="{bound / 1000:g}"}} %d\n' for bound in PingTarget.RTT_BUCKETS]
+                + ['pingcore_target_rtt_seconds_bucket{LABELS},le="+Inf"} %d\n',
+                   'pingcore_target_rtt_seconds_sum{LABELS}} %d.%03d\n',
+                   'pingcore_target_rtt_seconds_count{LABELS}} %d\n']),
+        'pingcore_target_probes_total{LABELS}} %d\n',
+        'pingcore_target_lost_total{LABELS}} %d\n',
+        'pingcore_target_loss_ratio{LABELS}} %s\n',
+    )
+
+    FAMILIES = (
+        b"# HELP pingcore_target_rtt_seconds Round trip time of successful pings.\n"
+        b"# TYPE pingcore_target_rtt_seconds histogram\n",
+        b"# HELP pingcore_target_info IP Address pinged for the target.\n"
+        b"# TYPE pingcore_target_info gauge\n",
+        b"# HELP pingcore_target_probes_total Pings sent to the target.\n"
+        b"# TYPE pingcore_target_probes_total counter\n",
+        b"# HELP pingcore_target_lost_total Pings to the target which got no reply.\n"
+        b"# TYPE pingcore_target_lost_total counter\n",
+        f"# HELP pingcore_target_loss_ratio Ratio of lost pings among the last {PingTarget.HISTORY_SIZE}.\n"
+        "# TYPE pingcore_target_loss_ratio gauge\n".encode("utf-8"),
+    )
+
+    def __init__(self, monitor=None, host="127.0.0.1", port=9108, names=str):
+        self.monitor = monitor
+        self.host = host
+        self.port = port
+        self.names = names
+
+        self.server = None
+        self.thread = None
+
+        self.templates = dict()
+        self.lines = dict()
+        self.lock = threading.Lock()
+        self.lastScrape = None
+
+    def start(self):
+        self.server = ThreadingHTTPServer((self.host, self.port), MetricsRequestHandler)
+        self.server.daemon_threads = True
+        self.server.exporter = self
+        self.port = self.server.server_address[1]
+
+        # Makes the templates of the targets known so far before the first scrape needs them
+        self.render()
+
+        self.thread = threading.Thread(target=self.server.serve_forever, name="pingcore-exporter", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is None:
+            return
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.server = None
+        self.thread = None
+
+    def getTemplates(self, target):
+        '''
+        Returns (info line, histogram, probes, lost and loss ratio templates) of target, made once per key
+        '''
+        cached = self.templates.get(target.key)
+        if cached is not None and cached[0] == target.ip_address:
+            return cached[1]
+
+        labels = '{target="%s"' % escapeLabel(str(self.names(target.key)))
+        info = f'pingcore_target_info{labels},ip_address="{escapeLabel(target.ip_address)}"}} 1\n'.encode("utf-8")
+
+        # Formatted with %, so a % in the key must not be taken for a placeholder
+        labels = labels.replace("%", "%%")
+        templates = (info, *[template.replace(self.LABELS, labels).encode("utf-8") for template in self.TEMPLATES])
+
+        self.templates[target.key] = (target.ip_address, templates)
+        return templates
+
+    def targetLines(self, target):
+        '''
+        Returns the lines of target, one per metric family, formatted again
+        only when its state changed since the previous scrape
+        '''
+        state = (target.probes, target.lost, target.rttSum, target.successBits, target.historyLen)
+        cached = self.lines.get(target.key)
+        if cached is not None and cached[0] == state:
+            return cached[1]
+
+        info, histogram, probes, lost, loss = self.getTemplates(target)
+        counts = target.rttCounts
+        cumulative = tuple(accumulate(counts)) if counts is not None else self.EMPTY_HISTOGRAM
+        rttSum = state[2]       # in milliseconds
+        lines = (
+            histogram % (*cumulative, rttSum // 1000, rttSum % 1000, cumulative[-1]),
+            info,
+            probes % state[0],
+            lost % state[1],
+            loss % lossRatio(state[3], state[4]),
+        )
+
+        self.lines[target.key] = (state, lines)
+        return lines
+
+    def render(self):
+        '''
+        Returns the body of a scrape, as bytes
+        '''
+        monitor = self.monitor
+        if monitor is None:
+            return b""
+
+        start = time.perf_counter()
+        targets = list(monitor.targets.values())
+        if len(self.templates) > 2 * len(targets):
+            self.templates = dict()
+            self.lines = dict()
+
+        targetLines = self.targetLines
+        lines = [targetLines(target) for target in targets]
+
+        out = list()
+        for family, header in enumerate(self.FAMILIES):
+            out.append(header)
+            out.extend([targetLine[family] for targetLine in lines])
+
+        out.append(self.renderEngine(monitor, len(targets), time.perf_counter() - start).encode("utf-8"))
+        return b"".join(out)
+
+    def renderEngine(self, monitor, targetCount, targetsDuration):
+        statistics = monitor.statistics()
+        now = time.monotonic()
+
+        # Rate of pings since the previous scrape of the same Monitor, or since it started
+        with self.lock:
+            previous = self.lastScrape
+            self.lastScrape = (id(monitor), now, statistics["dispatched"])
+        if previous is not None and previous[0] == id(monitor) and now > previous[1]:
+            rate = (statistics["dispatched"] - previous[2]) / (now - previous[1])
+        elif monitor.startedAt is not None and now > monitor.startedAt:
+            rate = statistics["dispatched"] / (now - monitor.startedAt)
+        else:
+            rate = 0.0
+
+        metrics = [
+            ("pingcore_probes_total", "counter", "Pings started by the engine.", statistics["dispatched"]),
+            ("pingcore_probes_per_second", "gauge", "Pings started per second since the previous scrape.", rate),
+            ("pingcore_schedule_lag_seconds_total", "counter", "Total delay between pings being due and being started.", statistics["lagSum"]),
+            ("pingcore_schedule_lag_seconds", "gauge", "Delay between the last ping being due and being started.", statistics["lastLag"]),
+            ("pingcore_scheduled_targets", "gauge", "Targets waiting for their next ping.", statistics["scheduled"]),
+            ("pingcore_overdue_targets", "gauge", "Targets whose ping is due but not started yet.", statistics["overdue"]),
+            ("pingcore_stream_queued_results", "gauge", "Results waiting in streams for their consumers.", statistics["queued"]),
+            ("pingcore_stream_dropped_results_total", "counter", "Results dropped by streams whose consumers fell behind.", statistics["dropped"]),
+            ("pingcore_active_workers", "gauge", "Threads pinging targets.", statistics["activeWorkers"]),
+            ("pingcore_targets", "gauge", "Targets being monitored.", targetCount),
+            ("pingcore_scrape_targets_duration_seconds", "gauge", "Time taken to render the per-target metrics of this scrape.", targetsDuration),
+        ]
+
+        return "".join(f"# HELP {name} {description}\n# TYPE {name} {kind}\n{name} {value}\n"
+                       for name, kind, description, value in metrics)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+
+        body = self.server.exporter.render()
+        self.send_response(200)
+        self.send_header("Content-Type", MetricsExporter.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def escapeLabel(value):
+    if "\\" not in value and "\"" not in value and "\n" not in value:
+        return value
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+@functools.lru_cache(maxsize=None)
+def lossRatio(successBits, historyLen):
+    # Only HISTORY_SIZE * 2 ** HISTORY_SIZE combinations exist, so each is formatted once
+    if historyLen == 0:
+        return b"0"
+
+    return f"{1 - successBits.bit_count() / historyLen:g}".encode("utf-8")
@@ -0,0 +1,265 @@
+from array import array
+from bisect import bisect_left
+
+import math
+import threading
+
+
+class HistoryLevel:
+    '''
+    Buckets of one aggregate level of a LatencyHistory, from bucket number base on
+    '''
+
+    __slots__ = ("base", "times", "mins", "maxs", "lost")
+
+    def __init__(self, timestamp, low, high, lost):
+        self.base = 0
+        self.times = array("d", [timestamp])    # of the first sample of each bucket
+        self.mins = array("f", [low])
+        self.maxs = array("f", [high])
+        self.lost = array("I", [lost])
+
+    def trim(self, count):
+        del self.times[:count]
+        del self.mins[:count]
+        del self.maxs[:count]
+        del self.lost[:count]
+        self.base += count
+
+
+class LatencyHistory:
+    '''
+    Round trip time history of a target, with min/max aggregates at several
+    resolutions so that any time range can be decimated to a pixel width
+    without visiting every sample.
+
+    Level 0 holds the raw samples, and each bucket of level n aggregates
+    FACTOR buckets of level n - 1. A lost ping is recorded as NaN and only
+    counted in the lost aggregates.
+
+    Nothing is allocated until the first sample, and a level only once the
+    level below has more than one bucket. Every level but the coarsest keeps
+    its last LIMIT buckets or so, so the raw samples only go back a few
+    minutes while older samples are still charted from coarser buckets.
+    '''
+
+    __slots__ = ("count", "base", "times", "rtts", "levels", "lock")
+
+    FACTOR = 8
+    LEVELS = 7      # coarsest bucket holds FACTOR ** 6 samples (~3 days at 2 pings/s)
+    LIMIT = 2048    # buckets kept per level, but for the coarsest which keeps them all
+
+    def __init__(self):
+        self.count = 0
+        self.base = 0           # number of the first raw sample kept
+        self.times = None
+        self.rtts = None
+        self.levels = ()        # HistoryLevel of levels 1 and up
+        self.lock = None        # created with the arrays, on the first sample
+
+    def __len__(self):
+        return self.count
+
+    def append(self, timestamp, rtt):
+        '''
+        Records a sample; rtt is None for a lost ping.
+        Samples must be appended in time order.
+        '''
+        if self.lock is None:
+            self.times = array("d")
+            self.rtts = array("f")
+            self.levels = list()
+            self.lock = threading.Lock()
+
+        isLost = rtt is None
+        low = math.inf if isLost else rtt
+        high = -math.inf if isLost else rtt
+
+        with self.lock:
+            index = self.count
+            size = 1
+            for level in range(1, self.LEVELS):
+                size *= self.FACTOR
+                if level > len(self.levels):
+                    if index < size // self.FACTOR:
+                        # The level below still has a single bucket
+                        break
+                    self.levels.append(HistoryLevel(self.bucketTime(level - 1, 0), *self.bucketAt(level - 1, 0)))
+
+                aggregate = self.levels[level - 1]
+                if index % size == 0:
+                    aggregate.times.append(timestamp)
+                    aggregate.mins.append(low)
+                    aggregate.maxs.append(high)
+                    aggregate.lost.append(isLost)
+                    if level < self.LEVELS - 1 and len(aggregate.times) > self.LIMIT + self.LIMIT // self.FACTOR:
+                        aggregate.trim(self.LIMIT // self.FACTOR)
+                else:
+                    # Samples always fall into the last bucket
+                    if low < aggregate.mins[-1]:
+                        aggregate.mins[-1] = low
+                    if high > aggregate.maxs[-1]:
+                        aggregate.maxs[-1] = high
+                    aggregate.lost[-1] += isLost
+
+            self.rtts.append(math.nan if isLost else rtt)
+            self.times.append(timestamp)
+            if len(self.times) > self.LIMIT + self.LIMIT // self.FACTOR:
+                del self.rtts[:self.LIMIT // self.FACTOR]
+                del self.times[:self.LIMIT // self.FACTOR]
+                self.base += self.LIMIT // self.FACTOR
+
+            self.count = index + 1
+
+    def bucketAt(self, level, bucket):
+        '''
+        Returns (min, max, lost) of a bucket, or None if it is no longer kept
+        '''
+        if level == 0:
+            i = bucket - self.base
+            if i < 0:
+                return None
+            rtt = self.rtts[i]
+            return (math.inf, -math.inf, 1) if rtt != rtt else (rtt, rtt, 0)
+
+        aggregate = self.levels[level - 1]
+        i = bucket - aggregate.base
+        if i < 0:
+            return None
+        return aggregate.mins[i], aggregate.maxs[i], aggregate.lost[i]
+
+    def bucketTime(self, level, bucket):
+        if level == 0:
+            return self.times[bucket - self.base]
+
+        aggregate = self.levels[level - 1]
+        return aggregate.times[bucket - aggregate.base]
+
+    def rangeMinMax(self, start, end):
+        '''
+        Returns (min, max, lost) over samples [start, end).
+        min and max are inf and -inf when every sample was lost.
+        Samples which are no longer kept are taken from the coarser bucket
+        holding them, which may reach outside the range.
+        '''
+        lock = self.lock
+        if lock is None:
+            return math.inf, -math.inf, 0
+
+        with lock:
+            return self.aggregate(start, end, self.view())
+
+    def view(self):
+        # Per level bucket arrays, level 0 being the raw samples; read with the lock held
+        levels = self.levels
+        return ([self.base] + [level.base for level in levels],
+                [self.rtts] + [level.mins for level in levels],
+                [self.rtts] + [level.maxs for level in levels],
+                [None] + [level.lost for level in levels])
+
+    def aggregate(self, start, end, view):
+        # rangeMinMax() with the lock held
+        bases, mins, maxs, losts = view
+        rtts = self.rtts
+        base = self.base
+        levels = len(bases)
+        low, high, lost = math.inf, -math.inf, 0
+        level, size = 0, 1
+
+        while start < end:
+            if level == 0 and start >= base and (start % self.FACTOR or start + self.FACTOR > end or levels == 1):
+                # Raw sample
+                rtt = rtts[start - base]
+                if rtt != rtt:
+                    lost += 1
+                else:
+                    if rtt < low:
+                        low = rtt
+                    if rtt > high:
+                        high = rtt
+                start += 1
+                continue
+
+            # Climb while a whole, aligned bucket of the next level fits
+            nextSize = size * self.FACTOR
+            if level + 1 < levels and start % nextSize == 0 and start + nextSize <= end:
+                level, size = level + 1, nextSize
+                continue
+
+            if start + size > end:
+                level, size = level - 1, size // self.FACTOR
+                continue
+
+            i = start // size - bases[level]
+            if i < 0:
+                # Only coarser levels go back that far; the coarsest keeps everything
+                while i < 0:
+                    level, size = level + 1, size * self.FACTOR
+                    i = start // size - bases[level]
+                start = (start // size + 1) * size
+            else:
+                start += size
+
+            if level == 0:
+                rtt = rtts[i]
+                bucketLow, bucketHigh, bucketLost = (math.inf, -math.inf, 1) if rtt != rtt else (rtt, rtt, 0)
+            else:
+                bucketLow, bucketHigh, bucketLost = mins[level][i], maxs[level][i], losts[level][i]
+            if bucketLow < low:
+                low = bucketLow
+            if bucketHigh > high:
+                high = bucketHigh
+            lost += bucketLost
+
+        return low, high, lost
+
+    def timeToIndex(self, timestamp):
+        '''
+        Returns the number of the first sample at or after timestamp, as
+        precisely as the finest level which goes back that far allows
+        '''
+        if self.times[0] <= timestamp:
+            return self.base + bisect_left(self.times, timestamp)
+
+        size = 1
+        for aggregate in self.levels:
+            size *= self.FACTOR
+            if aggregate.times[0] <= timestamp:
+                return min((aggregate.base + bisect_left(aggregate.times, timestamp)) * size, self.count)
+
+        return self.levels[-1].base * size if self.levels else self.base
+
+    def columns(self, t0, t1, width):
+        '''
+        Decimates the samples between timestamps t0 and t1 to width columns.
+        Returns a list of (min, max, lost) per column, or None for a column
+        without samples. Columns narrower than the kept buckets repeat the
+        bucket they fall into.
+        '''
+        lock = self.lock
+        if lock is None:
+            return [None] * width
+
+        step = (t1 - t0) / width
+        result = []
+
+        with lock:
+            count = self.count
+            if count == 0:
+                # The first sample is being appended
+                return [None] * width
+
+            view = self.view()
+            start = self.timeToIndex(t0)
+            for column in range(width):
+                end = max(self.timeToIndex(t0 + (column + 1) * step), start)
+                if end > start:
+                    result.append(self.aggregate(start, end, view))
+                elif 0 < start < count and start - 1 < self.base:
+                    # Within a coarse bucket whose samples were dropped
+                    result.append(self.aggregate(start - 1, start, view))
+                else:
+                    result.append(None)
+                start = end
+
+        return result
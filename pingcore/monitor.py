@@ -0,0 +1,237 @@
+from .target import PingTarget
+from .probe import ping
+from .stream import ResultPublisher
+
+import functools
+import heapq
+import itertools
+import platform
+import threading
+import time
+
+
+class Monitor(ResultPublisher):
+    '''
+    Pings a set of targets from background threads and streams the results.
+    interval: float
+        Seconds to wait after a target's ping before pinging it again
+
+    concurrent: bool
+        Ping targets simultaneously from up to maxWorkers threads, or one
+        after another from a single thread
+
+    maxWorkers: int
+        Maximum number of threads pinging at once when concurrent
+
+    probe: callable
+        Pings an IP Address and returns its response as probe.ping() does;
+        defaults to the system's ping command
+    '''
+
+    def __init__(self, interval=0.5, concurrent=True, maxWorkers=32, probe=None):
+        self.interval = interval
+        self.concurrent = concurrent
+        self.maxWorkers = maxWorkers
+        self.probe = probe if probe is not None else functools.partial(ping, system=platform.system())
+        super().__init__()
+
+        self.targets = dict()
+        self.workers = list()
+        self.activeWorkers = 0
+        self.running = False
+        self.stoppedStreams = list()    # streams to end once the workers are done
+
+        # Targets waiting for their next ping, as (due, order, target). An entry,
+        # and then its ping, is only valid while tokens maps the key to its
+        # order, so a target removed and added again is never scheduled twice
+        self.schedule = []
+        self.order = itertools.count()
+        self.tokens = dict()            # key -> order of its valid schedule entry
+        self.removed = dict()           # key -> (target, order) of removed targets still scheduled
+
+        # Scheduling statistics, updated with condition held
+        self.startedAt = None
+        self.dispatched = 0
+        self.lagSum = 0.0
+        self.lastLag = 0.0
+
+    def addTarget(self, target, key=None):
+        '''
+        Adds a target, given as an IP Address or a PingTarget, and returns its PingTarget.
+        key defaults to the IP Address and must be unique.
+        '''
+        if not isinstance(target, PingTarget):
+            target = PingTarget(target if key is None else key, target)
+
+        with self.condition:
+            if target.key in self.targets:
+                raise ValueError(f"Target {target.key!r} has already been added")
+
+            self.targets[target.key] = target
+            if self.running:
+                target.enabled = True
+                removed = self.removed.pop(target.key, None)
+                if removed is not None and removed[0] is target:
+                    # Added again before its entry or ping ended: that one carries on
+                    self.tokens[target.key] = removed[1]
+                else:
+                    self.scheduleTarget(target, time.monotonic())
+                self.startWorkers()
+
+        return target
+
+    def removeTarget(self, key):
+        '''
+        Stops pinging the target with key and returns its PingTarget
+        '''
+        with self.condition:
+            target = self.targets.pop(key)
+            token = self.tokens.pop(key, None)
+            if token is not None:
+                self.removed[key] = (target, token)
+            return target
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            if self.activeWorkers > 0:
+                raise RuntimeError("Monitor is still stopping")
+
+            self.running = True
+            self.schedule = []
+            self.tokens = dict()
+            self.removed = dict()
+            self.workers = list()
+            now = time.monotonic()
+            self.startedAt = now
+            for target in self.targets.values():
+                target.enabled = True
+                self.scheduleTarget(target, now)
+
+            self.startWorkers()
+
+    def startWorkers(self):
+        # One worker per target when concurrent, up to maxWorkers
+        workerCount = min(max(len(self.targets), 1), self.maxWorkers) if self.concurrent else 1
+        while len(self.workers) < workerCount:
+            worker = threading.Thread(target=self.work, name=f"pingcore-worker-{len(self.workers)}", daemon=True)
+            self.workers.append(worker)
+            self.activeWorkers += 1
+            worker.start()
+
+    def stop(self):
+        '''
+        Stops pinging without waiting; the streams open now end once the pings
+        in progress have been delivered
+        '''
+        with self.condition:
+            if not self.running:
+                return
+
+            self.running = False
+            self.stoppedStreams = self.streams
+            self.condition.notify_all()
+
+    def join(self, timeout=None):
+        for worker in list(self.workers):
+            worker.join(timeout)
+
+    def activeWorkerCount(self):
+        return self.activeWorkers
+
+    def statistics(self):
+        '''
+        Returns the engine's own statistics. Nothing is locked, so the values
+        may be a ping apart from each other:
+            dispatched      pings started since the Monitor was created
+            lagSum          total delay between pings being due and being started, in seconds
+            lastLag         delay of the last ping started, in seconds
+            scheduled       targets waiting for their next ping
+            overdue         targets whose ping is due but not started yet
+            queued          results waiting in streams for their consumers
+            dropped         results dropped by streams whose consumers fell behind
+            activeWorkers   threads pinging
+        '''
+        streams = self.streams
+        schedule = list(self.schedule)
+        now = time.monotonic()
+        return {
+            "dispatched": self.dispatched,
+            "lagSum": self.lagSum,
+            "lastLag": self.lastLag,
+            "scheduled": len(schedule),
+            "overdue": sum(1 for entry in schedule if entry[0] <= now),
+            "queued": sum(len(stream.queue) for stream in streams),
+            "dropped": sum(stream.dropped for stream in streams),
+            "activeWorkers": self.activeWorkers,
+        }
+
+    def scheduleTarget(self, target, due):
+        order = next(self.order)
+        self.tokens[target.key] = order
+        heapq.heappush(self.schedule, (due, order, target))
+        self.condition.notify()
+
+    def forget(self, target, token):
+        # The entry or ping of a removed target ended
+        if self.removed.get(target.key) == (target, token):
+            del self.removed[target.key]
+
+    def nextTarget(self):
+        '''
+        Waits until a target is due and returns (target, token), or None once stopped
+        '''
+        with self.condition:
+            while True:
+                if not self.running:
+                    return None
+
+                if self.schedule:
+                    due, order, target = self.schedule[0]
+                    delay = due - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self.schedule)
+                        if self.tokens.get(target.key) == order:
+                            self.dispatched += 1
+                            self.lagSum -= delay
+                            self.lastLag = -delay
+                            return target, order
+                        self.forget(target, order)
+                        continue
+                else:
+                    delay = None
+
+                self.condition.wait(delay)
+
+    def work(self):
+        while True:
+            scheduled = self.nextTarget()
+            if scheduled is None:
+                break
+            target, token = scheduled
+
+            try:
+                target.isIPAddressValid()
+                result = target.update(self.probe(target.ip_address))
+            except Exception as error:
+                target.enabled = False
+                result = target.errorResult(error)
+
+            with self.condition:
+                if self.tokens.get(target.key) != token:
+                    # Removed meanwhile
+                    self.forget(target, token)
+                elif target.enabled and self.running:
+                    self.scheduleTarget(target, time.monotonic() + self.interval)
+                else:
+                    del self.tokens[target.key]
+
+            self.publish(result)
+
+        with self.condition:
+            self.activeWorkers -= 1
+            if self.activeWorkers == 0:
+                # Last worker to finish
+                self.closeStreams(self.stoppedStreams)
+                self.stoppedStreams = list()
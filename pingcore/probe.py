@@ -0,0 +1,82 @@
+import platform
+import subprocess
+import re
+import time
+
+
+def ping(ip_address, system=None):
+    '''
+    Pings ip_address once.
+    Returns [timestamp, min, max, current] on success, or [message] on failure.
+    '''
+    pingCount = 1
+    if system is None:
+        system = platform.system()
+
+    if system == "Windows":
+        return pingOnWindows(ip_address, pingCount)
+
+    if system == "Darwin":
+        return pingOnMac(ip_address, pingCount)
+
+    return pingOnLinux(ip_address, pingCount)
+
+
+def pingOnWindows(ip_address, pingCount):
+    timeOut = 1000  # in milliseconds
+
+    cmd = 'ping -n %d -w %d %s' % (pingCount, timeOut, ip_address)
+    ping_response = subprocess.run(cmd, stdout=subprocess.PIPE, shell=True)
+    timestamp = time.time()
+    stdout = ping_response.stdout.decode("utf-8")
+
+    stdout_lines = [line.strip() for line in stdout.split('\n') if line.strip() != '']
+
+    if "TTL" in stdout:
+        return [timestamp] + [int(x.strip("ms")) for x in re.findall(r"\d+ms", stdout_lines[-1])]
+
+    return [stdout_lines[1].strip(".")]
+
+
+def pingOnMac(ip_address, pingCount):
+    timeOut = 1000  # in milliseconds
+    if pingCount < 2:
+        pingCount = 2
+    cmd = 'ping -c %d -W %d %s' % (pingCount, timeOut, ip_address)
+    ping_response = subprocess.run(cmd, stdout=subprocess.PIPE, shell=True)
+    timestamp = time.time()
+    stdout = ping_response.stdout.decode("utf-8")
+
+    stdout_lines = [line.strip() for line in stdout.split('\n') if line.strip() != '']
+
+    if "round-trip" in stdout:
+        result = [timestamp] + [round(float(x.strip("/"))) for x in re.findall(r"\d+.\d+/", stdout_lines[-1])]
+        result[2], result[3] = result[3], result[2]
+        return result
+
+    if "Destination Host Unreachable" in stdout_lines[1]:
+        ip = re.findall(r"\d+.\d+.\d+.\d+", stdout_lines[1])[0]
+        return [f"Reply from {ip}: Destination host unreachable"]
+
+    if "Request timeout" in stdout_lines[1]:
+        return ["Request timed out"]
+
+    return [stdout_lines[1]]
+
+
+def pingOnLinux(ip_address, pingCount):
+    timeOut = 1    # in seconds
+
+    cmd = 'ping -c %d -W %d %s' % (pingCount, timeOut, ip_address)
+    ping_response = subprocess.run(cmd, stdout=subprocess.PIPE, shell=True)
+    timestamp = time.time()
+    stdout = ping_response.stdout.decode("utf-8")
+
+    stdout_lines = [line.strip() for line in stdout.split('\n') if line.strip() != '']
+
+    if "ttl" in stdout:
+        result = [timestamp] + [round(float(x.strip("/"))) for x in re.findall(r"\d+.\d+/", stdout_lines[-1])]
+        result[2], result[3] = result[3], result[2]
+        return result
+
+    return ["Destination host unreachable"]
@@ -0,0 +1,199 @@
+'''
+Binary protocol between probe agents and a collector, over a persistent TCP connection.
+
+Every frame is a header, type (uint8) and payload length (uint32), followed
+by its payload. All integers are little-endian.
+
+agent -> collector
+    HELLO       session (uint64), agent id (utf-8)
+    TARGET      target id (uint32), key length (uint16), key (utf-8), ip_address (utf-8)
+    MESSAGE     message id (uint32), text (utf-8)
+    RESULTS     sequence number (uint64), then RECORD for each result
+
+collector -> agent
+    WELCOME     last sequence number received in this session (uint64), window (uint32)
+    ACK         sequence number (uint64) up to which every RESULTS frame was received
+
+Targets and messages are declared once and then referred to by id, so a
+result is a fixed size RECORD. An agent numbers its RESULTS frames from 1
+within a session, a random number picked when it starts. After a reconnect,
+the collector's WELCOME tells it which frames to send again; frames the
+collector has seen already are ignored. An agent has at most window frames
+unacknowledged, and the collector delays its ACKs while its consumers fall
+behind, which is how backpressure reaches the agents.
+'''
+from .records import PingResult
+
+import struct
+import math
+
+
+HELLO = 1
+TARGET = 2
+MESSAGE = 3
+RESULTS = 4
+WELCOME = 5
+ACK = 6
+
+HEADER = struct.Struct("<BI")
+SESSION = struct.Struct("<Q")
+TARGET_HEADER = struct.Struct("<IH")
+MESSAGE_HEADER = struct.Struct("<I")
+SEQUENCE = struct.Struct("<Q")
+WELCOME_PAYLOAD = struct.Struct("<QI")
+
+# target id, timestamp, lastResponseTime (NaN if unset), rtt (-1 if lost),
+# Min, Max (-1 if unset), Avg, successRate, flags, message id (0 if none)
+RECORD = struct.Struct("<IddiiiiBBI")
+FLAG_ERROR = 1
+
+MAX_PAYLOAD = 64 * 1024 * 1024
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class RemoteError(Exception):
+    '''
+    Error which stopped an agent from pinging a target, as reported by the agent
+    '''
+    pass
+
+
+def unpack(layout, payload):
+    '''
+    Unpacks a struct from a received payload, raising ProtocolError if it is too short
+    '''
+    try:
+        return layout.unpack_from(payload)
+    except struct.error:
+        raise ProtocolError(f"Payload of {len(payload)} bytes is truncated")
+
+
+def decodeText(data):
+    try:
+        return str(data, "utf-8")
+    except UnicodeDecodeError:
+        raise ProtocolError("Text is not valid UTF-8")
+
+
+def frame(frameType, payload):
+    return HEADER.pack(frameType, len(payload)) + payload
+
+
+async def readFrame(reader):
+    '''
+    Reads a frame from an asyncio StreamReader and returns (type, payload)
+    '''
+    frameType, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise ProtocolError(f"Frame of {length} bytes is too large")
+
+    return frameType, await reader.readexactly(length)
+
+
+def helloFrame(session, agentId):
+    return frame(HELLO, SESSION.pack(session) + agentId.encode("utf-8"))
+
+
+def parseHello(payload):
+    return unpack(SESSION, payload)[0], decodeText(payload[SESSION.size:])
+
+
+def targetFrame(targetId, key, ip_address):
+    key = key.encode("utf-8")
+    return frame(TARGET, TARGET_HEADER.pack(targetId, len(key)) + key + ip_address.encode("utf-8"))
+
+
+def parseTarget(payload):
+    targetId, length = unpack(TARGET_HEADER, payload)
+    offset = TARGET_HEADER.size
+    if offset + length > len(payload):
+        raise ProtocolError("TARGET frame is truncated")
+    return targetId, decodeText(payload[offset:offset + length]), decodeText(payload[offset + length:])
+
+
+def messageFrame(messageId, text):
+    return frame(MESSAGE, MESSAGE_HEADER.pack(messageId) + text.encode("utf-8"))
+
+
+def parseMessage(payload):
+    return unpack(MESSAGE_HEADER, payload)[0], decodeText(payload[MESSAGE_HEADER.size:])
+
+
+def welcomeFrame(sequence, window):
+    return frame(WELCOME, WELCOME_PAYLOAD.pack(sequence, window))
+
+
+def parseWelcome(payload):
+    '''
+    Returns (last sequence number received, window) of a WELCOME payload
+    '''
+    return unpack(WELCOME_PAYLOAD, payload)
+
+
+def ackFrame(sequence):
+    return frame(ACK, SEQUENCE.pack(sequence))
+
+
+def parseSequence(payload):
+    '''
+    Returns the sequence number an ACK or RESULTS payload starts with
+    '''
+    return unpack(SEQUENCE, payload)[0]
+
+
+def encodeResults(sequence, records):
+    '''
+    Returns the RESULTS frame of already packed records
+    '''
+    return frame(RESULTS, SEQUENCE.pack(sequence) + records)
+
+
+def packRecord(targetId, messageId, result):
+    return RECORD.pack(
+        targetId,
+        result.timestamp,
+        math.nan if result.lastResponseTime is None else result.lastResponseTime,
+        -1 if result.rtt is None else result.rtt,
+        -1 if result.Min is None else result.Min,
+        -1 if result.Max is None else result.Max,
+        result.Avg,
+        result.successRate,
+        FLAG_ERROR if result.error is not None else 0,
+        messageId,
+    )
+
+
+def decodeResults(payload, targets, messages, agent):
+    '''
+    Returns (sequence number, list of PingResult) of a RESULTS payload.
+    targets maps target ids to (key, ip_address), and messages maps message ids to text.
+    '''
+    sequence = parseSequence(payload)
+    body = memoryview(payload)[SEQUENCE.size:]
+    if len(body) % RECORD.size:
+        raise ProtocolError("RESULTS frame is truncated")
+
+    results = list()
+    append = results.append
+    try:
+        for targetId, timestamp, lastResponseTime, rtt, Min, Max, Avg, successRate, flags, messageId in RECORD.iter_unpack(body):
+            key, ip_address = targets[targetId]
+            message = messages[messageId] if messageId else None
+            append(PingResult(
+                key, ip_address, timestamp,
+                None if rtt < 0 else rtt,
+                None if Min < 0 else Min,
+                None if Max < 0 else Max,
+                Avg, successRate,
+                None if lastResponseTime != lastResponseTime else lastResponseTime,     # NaN
+                message,
+                RemoteError(message) if flags & FLAG_ERROR else None,
+                agent,
+            ))
+    except KeyError as error:
+        raise ProtocolError(f"Undeclared target or message {error}")
+
+    return sequence, results
@@ -0,0 +1,50 @@
+from typing import NamedTuple, Hashable, Optional
+
+
+class PingResult(NamedTuple):
+    '''
+    Outcome of a single ping of a target.
+
+    key
+        Key of the target, as given to Monitor.addTarget
+
+    ip_address
+        IP Address which was pinged
+
+    timestamp
+        Time of the ping, in seconds since the epoch
+
+    rtt
+        Round trip time in milliseconds, None if the ping was lost
+
+    Min, Max, Avg
+        Round trip time statistics in milliseconds since the last reset,
+        None (Avg 0) if no ping has succeeded yet
+
+    successRate
+        Percentage of successful pings among the last PingTarget.HISTORY_SIZE
+
+    lastResponseTime
+        Time of the last successful ping, None if there was none
+
+    message
+        Reason reported by ping when the ping was lost
+
+    error
+        Exception which stopped the target from being pinged, if any
+
+    agent
+        Id of the agent which pinged the target, None if pinged locally
+    '''
+    key: Hashable
+    ip_address: str
+    timestamp: float
+    rtt: Optional[int]
+    Min: Optional[int]
+    Max: Optional[int]
+    Avg: int
+    successRate: int
+    lastResponseTime: Optional[float]
+    message: Optional[str] = None
+    error: Optional[BaseException] = None
+    agent: Optional[str] = None
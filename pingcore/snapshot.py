@@ -0,0 +1,117 @@
+'''
+Binary snapshot of every target's statistics, used to warm restart a session.
+
+Layout (little-endian):
+    header: magic b"PTSS", version (uint16), record count (uint32)
+    record: name length (uint16), name (utf-8), ip_address length (uint8), ip_address (utf-8),
+            i (uint32), Min, Max, Avg (int32, -1 if unset),
+            successBits (uint16), historyLen (uint8), lastResponseTime (float64, NaN if unset)
+'''
+import os
+import struct
+import math
+
+
+MAGIC = b"PTSS"
+VERSION = 2
+
+NAME_LENGTH = struct.Struct("<H")
+
+HEADER = struct.Struct("<4sHI")
+RECORD = struct.Struct("<IiiiHBd")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def packSnapshot(targets, names=None):
+    '''
+    Serialises the statistics of targets (PingTarget) into bytes.
+    names are stored alongside so that a target is only restored to the
+    same name and IP Address; they default to the targets' keys.
+    '''
+    if names is None:
+        names = [str(target.key) for target in targets]
+
+    chunks = [HEADER.pack(MAGIC, VERSION, len(targets))]
+    pack = RECORD.pack
+    for name, target in zip(names, targets):
+        name = name.encode("utf-8")
+        ip = target.ip_address.encode("utf-8")
+        chunks.append(NAME_LENGTH.pack(len(name)) + name + bytes((len(ip),)) + ip)
+        chunks.append(pack(
+            target.i,
+            -1 if target.Min is None else target.Min,
+            -1 if target.Max is None else target.Max,
+            target.Avg,
+            target.successBits,
+            target.historyLen,
+            math.nan if target.lastResponseTime is None else target.lastResponseTime,
+        ))
+
+    return b"".join(chunks)
+
+
+def writeSnapshot(path, data):
+    '''
+    Atomically replaces the snapshot at path with data
+    '''
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as snapshot_file:
+        snapshot_file.write(data)
+    os.replace(tmp_path, path)
+
+
+def readSnapshot(path):
+    '''
+    Returns the snapshot at path as bytes, or None if there is none
+    '''
+    if not (os.path.isfile(path) and os.access(path, os.R_OK)):
+        return None
+
+    with open(path, "rb") as snapshot_file:
+        return snapshot_file.read()
+
+
+def iterSnapshot(data):
+    '''
+    Lazily yields (name, ip_address, state) for every record of a snapshot,
+    where state can be passed to PingTarget.restore()
+    '''
+    if len(data) < HEADER.size:
+        raise SnapshotError("Snapshot is truncated")
+
+    magic, version, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError("Unsupported snapshot format")
+
+    offset = HEADER.size
+    unpack_from = RECORD.unpack_from
+    for _ in range(count):
+        try:
+            length = NAME_LENGTH.unpack_from(data, offset)[0]
+            offset += NAME_LENGTH.size
+            name = data[offset:offset + length].decode("utf-8")
+            offset += length
+
+            length = data[offset]
+            ip_address = data[offset + 1:offset + 1 + length].decode("utf-8")
+            offset += 1 + length
+
+            i, Min, Max, Avg, successBits, historyLen, lastResponseTime = unpack_from(data, offset)
+        except (IndexError, struct.error):
+            raise SnapshotError("Snapshot is truncated")
+        except UnicodeDecodeError:
+            raise SnapshotError("Snapshot is corrupt")
+        offset += RECORD.size
+
+        yield name, ip_address, (
+            i,
+            None if Min < 0 else Min,
+            None if Max < 0 else Max,
+            Avg,
+            successBits,
+            historyLen,
+            None if math.isnan(lastResponseTime) else lastResponseTime,
+        )
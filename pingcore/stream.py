@@ -0,0 +1,197 @@
+from collections import deque
+import asyncio
+import threading
+import time
+
+
+class ResultPublisher:
+    '''
+    Fans results out to any number of ResultStream subscribers.
+    Subclasses call publish() or publishMany() from any thread, and
+    closeStreams() when they stop, with the streams which were open then.
+    '''
+
+    def __init__(self):
+        self.streams = list()       # replaced, never mutated, so that it can be read without locking
+        self.condition = threading.Condition()
+
+    def stream(self, batchSize=None, maxDelay=0, maxQueue=100000):
+        '''
+        Returns a ResultStream of every result from now on, until the
+        publisher stops. A stream opened while the publisher is stopped or
+        stopping stays open through its next run, which is how to subscribe
+        before start() without missing any result.
+        See ResultStream for the batching options.
+        '''
+        stream = ResultStream(self, batchSize, maxDelay, maxQueue)
+        with self.condition:
+            self.streams = self.streams + [stream]
+
+        return stream
+
+    def publish(self, result):
+        for stream in self.streams:
+            stream.put(result)
+
+    def publishMany(self, results):
+        for stream in self.streams:
+            stream.putMany(results)
+
+    def queuedResults(self):
+        '''
+        Returns the length of the longest stream queue
+        '''
+        return max((len(stream.queue) for stream in self.streams), default=0)
+
+    def queueFill(self):
+        '''
+        Returns how full the fullest stream queue is, from 0 to 1
+        '''
+        return max((len(stream.queue) / stream.queue.maxlen for stream in self.streams), default=0)
+
+    def closeStreams(self, streams=None):
+        '''
+        Ends streams, by default every open stream
+        '''
+        if streams is None:
+            streams = self.streams
+        for stream in streams:
+            stream.close()
+
+
+class ResultStream:
+    '''
+    Results of a Monitor or Collector, consumed with ```for result in stream```
+    from a thread or ```async for result in stream``` from an asyncio loop.
+    Iteration ends once the publisher has stopped and every result was consumed.
+
+    batchSize: int
+        Yield lists of up to batchSize results instead of single results
+
+    maxDelay: float
+        When batching, seconds to wait for a batch to fill up before yielding it
+
+    maxQueue: int
+        Results kept for a slow consumer; the oldest are dropped beyond this,
+        and counted in dropped
+    '''
+
+    def __init__(self, publisher, batchSize=None, maxDelay=0, maxQueue=100000):
+        self.publisher = publisher
+        self.batchSize = batchSize
+        self.maxDelay = maxDelay
+        self.queue = deque(maxlen=maxQueue)
+        self.dropped = 0
+        self.closed = False
+
+        self.condition = threading.Condition()
+        self.waiters = list()
+
+    def put(self, result):
+        with self.condition:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(result)
+            self.wake()
+
+    def putMany(self, results):
+        with self.condition:
+            overflow = len(self.queue) + len(results) - self.queue.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self.queue.extend(results)
+            self.wake()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.wake()
+
+        with self.publisher.condition:
+            self.publisher.streams = [stream for stream in self.publisher.streams if stream is not self]
+
+    def wake(self):
+        self.condition.notify_all()
+        for loop, future in self.waiters:
+            if loop.is_closed():
+                continue
+            try:
+                loop.call_soon_threadsafe(wakeFuture, future)
+            except RuntimeError:
+                # The loop closed in the meantime, along with its consumer
+                pass
+        self.waiters = list()
+
+    def take(self):
+        if self.batchSize is None:
+            return self.queue.popleft()
+
+        count = min(self.batchSize, len(self.queue))
+        return [self.queue.popleft() for _ in range(count)]
+
+    def isReady(self, deadline):
+        # Whether a single result or a batch may be taken now
+        if not self.queue:
+            return False
+        if self.batchSize is None or self.closed or len(self.queue) >= self.batchSize:
+            return True
+        return deadline is None or time.monotonic() >= deadline
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        deadline = None
+        with self.condition:
+            while True:
+                if self.queue and deadline is None and self.maxDelay:
+                    deadline = time.monotonic() + self.maxDelay
+
+                if self.isReady(deadline):
+                    return self.take()
+                if self.closed and not self.queue:
+                    raise StopIteration
+
+                self.condition.wait(None if deadline is None else max(deadline - time.monotonic(), 0))
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_running_loop()
+        deadline = None
+        while True:
+            with self.condition:
+                if self.queue and deadline is None and self.maxDelay:
+                    deadline = time.monotonic() + self.maxDelay
+
+                if self.isReady(deadline):
+                    return self.take()
+                if self.closed and not self.queue:
+                    raise StopAsyncIteration
+
+                future = loop.create_future()
+                waiter = (loop, future)
+                self.waiters.append(waiter)
+
+            try:
+                if deadline is None:
+                    await future
+                else:
+                    await asyncio.wait([future], timeout=max(deadline - time.monotonic(), 0))
+            finally:
+                # Not woken, e.g. cancelled or timed out: its loop may be gone by the next put()
+                with self.condition:
+                    if waiter in self.waiters:
+                        self.waiters.remove(waiter)
+
+
+def wakeFuture(future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,139 @@
+from .history import LatencyHistory
+from .records import PingResult
+
+from array import array
+from bisect import bisect_left
+import ipaddress
+import time
+
+
+class PingTarget:
+    '''
+    Compact per-target ping state.
+    key: hashable
+        Identifies the target, e.g. its row on a table
+
+    ip_address: str
+        IP Address which is to be pinged
+
+    The success/failure history of the last HISTORY_SIZE pings is kept as
+    a bit field (newest result in bit 0) instead of a list, and the
+    statistics are kept as numbers.
+
+    history: LatencyHistory
+        Optional full round trip time history, recorded only when set
+
+    Counters for metrics exporters (probes, lost, and a histogram of round
+    trip times over RTT_BUCKETS) are kept alongside; they are only written
+    by the thread pinging the target, so they can be read without locking.
+    '''
+
+    __slots__ = ("key", "ip_address", "enabled", "history", "successBits", "historyLen",
+                 "i", "lastResponseTime", "Min", "Max", "Avg",
+                 "probes", "lost", "rttCounts", "rttSum")
+
+    HISTORY_SIZE = 10
+    HISTORY_MASK = (1 << HISTORY_SIZE) - 1
+
+    # Upper bounds of the round trip time histogram buckets, in milliseconds
+    RTT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000)
+
+    def __init__(self, key, ip_address):
+        self.key = key
+        self.ip_address = ip_address
+        self.enabled = True
+        self.history = None
+        self.reset()
+
+    def reset(self):
+        self.successBits = 0
+        self.historyLen = 0
+
+        self.i = 0
+        self.lastResponseTime = None
+        self.Min = None
+        self.Max = None
+        self.Avg = 0
+
+        self.probes = 0
+        self.lost = 0
+        self.rttCounts = None   # created on the first successful ping
+        self.rttSum = 0
+
+        if self.history is not None:
+            # Replaced rather than cleared, as an engine thread may be appending to it
+            self.history = LatencyHistory()
+
+    def restore(self, state):
+        '''
+        Restores statistics read from a session snapshot
+        '''
+        self.i, self.Min, self.Max, self.Avg, self.successBits, self.historyLen, self.lastResponseTime = state
+
+    def isIPAddressValid(self):
+        '''
+        Raises ValueError if ip_address is not a valid IP Address
+        '''
+        ipaddress.ip_address(self.ip_address)
+
+    def successRate(self):
+        historyLen = self.historyLen
+        if historyLen == 0:
+            return 0
+
+        return round(self.successBits.bit_count() / historyLen * 100)
+
+    def update(self, ping_response):
+        '''
+        Records a ping response as returned by probe.ping() and returns its PingResult
+        '''
+        success = len(ping_response) == 4
+        self.successBits = ((self.successBits << 1) | success) & self.HISTORY_MASK
+        if self.historyLen < self.HISTORY_SIZE:
+            self.historyLen += 1
+        self.probes += 1
+
+        if success:
+            timestamp = ping_response[0]
+            rtt = ping_response[3]
+            message = None
+
+            # reset() may be called from another thread meanwhile, so every
+            # attribute which it sets to None is read once
+            Min, Max, counts = self.Min, self.Max, self.rttCounts
+
+            self.lastResponseTime = timestamp
+            self.Min = min(Min, ping_response[1]) if Min is not None else ping_response[1]
+            self.Max = max(Max, ping_response[2]) if Max is not None else ping_response[2]
+            self.Avg = round((self.i * self.Avg + rtt) / (self.i + 1))
+            self.i += 1
+
+            if counts is None:
+                counts = self.rttCounts = array("I", [0]) * (len(self.RTT_BUCKETS) + 1)
+            counts[bisect_left(self.RTT_BUCKETS, rtt)] += 1
+            self.rttSum += rtt
+        else:
+            timestamp = time.time()
+            rtt = None
+            message = ping_response[0]
+            self.lost += 1
+
+        if self.history is not None:
+            self.history.append(timestamp, rtt)
+
+        return PingResult(self.key, self.ip_address, timestamp, rtt, self.Min, self.Max, self.Avg,
+                          self.successRate(), self.lastResponseTime, message)
+
+    def errorResult(self, error):
+        '''
+        Returns the PingResult reporting an error which stopped the target from being pinged
+        '''
+        return PingResult(self.key, self.ip_address, time.time(), None, self.Min, self.Max, self.Avg,
+                          self.successRate(), self.lastResponseTime, str(error), error)
+
+
+def formatResponseTime(timestamp):
+    if timestamp is None:
+        return ""
+
+    return time.strftime("%d/%m/%Y  %H:%M:%S", time.localtime(timestamp))
@@ -3,7 +3,7 @@ from PySide6.QtCore import QObject, Signal
 
 class PingThreadSignals(QObject):
     '''
-    Defines the signals available from PingThread.
+    Defines the signals available from MonitorBridge.
 
     Supported signals are:
 
@@ -11,16 +11,16 @@ class PingThreadSignals(QObject):
         No data
 
     error
-        tuple (exctype, value, traceback.format_exc())
+        PingResult whose error stopped its target from being pinged
 
     result
-        tuple (row, successRate)
+        list of PingResult, including those reported through error
 
     finished
         No data
     '''
     started = Signal()
-    result = Signal(tuple)
-    error = Signal(tuple)
+    result = Signal(object)
+    error = Signal(object)
     finished = Signal()
     
\ No newline at end of file
@@ -0,0 +1,27 @@
+from PySide6.QtCore import QRunnable
+
+from pingcore.snapshot import writeSnapshot
+
+
+class SnapshotWriter(QRunnable):
+    '''
+    Writes a packed session snapshot to disk off the GUI thread.
+    path: str
+        Path of the snapshot file
+
+    data: bytes
+        Snapshot packed by pingcore.snapshot.packSnapshot
+    '''
+
+    def __init__(self, path, data):
+        super().__init__()
+
+        self.path = path
+        self.data = data
+
+    def run(self):
+        try:
+            writeSnapshot(self.path, self.data)
+        except OSError:
+            # The next periodic snapshot will try again
+            pass
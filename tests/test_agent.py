@@ -0,0 +1,171 @@
+from pingcore import Monitor
+from pingcore.agent import Agent
+from pingcore.collector import Collector
+from pingcore import protocol
+from pingcore.protocol import RemoteError
+
+from collections import defaultdict
+import itertools
+import threading
+import socket
+import asyncio
+import time
+
+
+def countingProbe():
+    # Numbers each target's pings from 1 in lastResponseTime, to tell lost or repeated results apart
+    counters = defaultdict(lambda: itertools.count(1))
+
+    def probe(ip_address):
+        return [float(next(counters[ip_address])), 10, 30, 20]
+    return probe
+
+
+def newAgent(collector, agentId, count=3, interval=0.001, **options):
+    monitor = Monitor(interval=interval, probe=countingProbe())
+    for n in range(count):
+        monitor.addTarget(f"10.0.0.{n + 1}")
+    options = dict(batchSize=50, maxDelay=0.01, reconnectDelay=0.01, **options)
+    return monitor, Agent(monitor, port=collector.port, agentId=agentId, **options)
+
+
+def runAgent(agent):
+    thread = threading.Thread(target=asyncio.run, args=(agent.run(),), daemon=True)
+    thread.start()
+    return thread
+
+
+def stopAgent(monitor, thread):
+    # The Agent ends by itself once every result of the stopped Monitor is acknowledged
+    monitor.stop()
+    monitor.join()
+    thread.join(10)
+    assert not thread.is_alive()
+
+
+def assertEveryResultOnce(results, monitors):
+    pings = defaultdict(list)
+    for result in results:
+        pings[result.agent, result.key].append(int(result.lastResponseTime))
+
+    expected = {(agentId, key): target.probes
+                for agentId, monitor in monitors.items() for key, target in monitor.targets.items()}
+    assert {series: sorted(numbers) for series, numbers in pings.items()} == \
+        {series: list(range(1, probes + 1)) for series, probes in expected.items()}
+
+
+def testSeveralAgents():
+    collector = Collector(port=0)
+    collector.start()
+    stream = collector.stream()
+
+    agents = {f"agent-{n}": newAgent(collector, f"agent-{n}") for n in range(3)}
+    threads = dict()
+    for agentId, (monitor, agent) in agents.items():
+        monitor.start()
+        threads[agentId] = runAgent(agent)
+    time.sleep(0.3)
+
+    for agentId, (monitor, agent) in agents.items():
+        stopAgent(monitor, threads[agentId])
+    collector.stop()
+
+    assertEveryResultOnce(list(stream), {agentId: monitor for agentId, (monitor, agent) in agents.items()})
+    assert collector.statistics()["agents"] == 3
+
+
+def testResumeAfterDroppedConnections():
+    collector = Collector(port=0)
+    collector.start()
+    stream = collector.stream()
+    monitor, agent = newAgent(collector, "paris")
+    monitor.start()
+    thread = runAgent(agent)
+
+    def drop():
+        for remote in collector.agents.values():
+            if remote.writer is not None:
+                remote.writer.close()
+
+    for _ in range(10):
+        time.sleep(0.05)
+        collector.loop.call_soon_threadsafe(drop)
+
+    stopAgent(monitor, thread)
+    collector.stop()
+
+    assertEveryResultOnce(list(stream), {"paris": monitor})
+    assert collector.agents["paris"].connections > 1
+
+
+def testSlowConsumerHoldsAgentsBack():
+    collector = Collector(port=0, window=2)
+    collector.start()
+    stream = collector.stream(maxQueue=1000)
+    monitor, agent = newAgent(collector, "paris", interval=0, maxBuffered=4)
+    monitor.start()
+    thread = runAgent(agent)
+
+    # Nothing is consumed for a while: the collector holds back its ACKs and the agent stops sending
+    buffered = 0
+    for _ in range(20):
+        time.sleep(0.02)
+        buffered = max(buffered, len(agent.unacked))
+    assert len(stream.queue) <= 1000
+    assert buffered <= agent.maxBuffered
+    assert stream.dropped == 0
+
+    # Consuming lets the agent carry on
+    received = 0
+    deadline = time.monotonic() + 5
+    for result in stream:
+        received += 1
+        if received > 5000 or time.monotonic() > deadline:
+            break
+    assert received > 5000
+
+    agent.stop()
+    monitor.stop()
+    thread.join(10)
+    collector.stop()
+    assert stream.dropped == 0
+
+
+def testErrorBeforeRunReachesCollector():
+    collector = Collector(port=0)
+    collector.start()
+    stream = collector.stream()
+    monitor = Monitor(interval=0.01, probe=countingProbe())
+    monitor.addTarget("not-an-ip", key="bad")
+    agent = Agent(monitor, port=collector.port, agentId="paris", maxDelay=0.01)
+
+    # The one-time error is published as soon as the Monitor starts
+    monitor.start()
+    deadline = time.monotonic() + 5
+    while monitor.targets["bad"].enabled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    thread = runAgent(agent)
+    stopAgent(monitor, thread)
+    agent.stop()
+    collector.stop()
+
+    errors = [result for result in stream if result.error is not None]
+    assert [(result.agent, result.key) for result in errors] == [("paris", "bad")]
+    assert isinstance(errors[0].error, RemoteError)
+
+
+def testMalformedFramesCloseTheConnection(caplog):
+    collector = Collector(port=0)
+    collector.start()
+    try:
+        for frames in (protocol.frame(protocol.HELLO, b"\x01"),
+                       protocol.frame(protocol.HELLO, protocol.SESSION.pack(1) + b"\xff"),
+                       protocol.helloFrame(1, "paris") + protocol.frame(protocol.RESULTS, b"\x01")):
+            with socket.create_connection(("127.0.0.1", collector.port), timeout=5) as sock:
+                sock.sendall(frames)
+                while sock.recv(4096):
+                    pass
+    finally:
+        collector.stop()
+
+    assert "Unhandled exception" not in caplog.text
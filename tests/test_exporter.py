@@ -0,0 +1,91 @@
+from pingcore import Monitor, PingTarget
+from pingcore.exporter import MetricsExporter
+
+import urllib.request
+
+
+def getExporter(*targets):
+    monitor = Monitor()
+    for target in targets:
+        monitor.addTarget(target)
+    return MetricsExporter(monitor)
+
+
+def familyOf(line):
+    name = line.split("{")[0].split(" ")[0]
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.startswith("pingcore_target_rtt_seconds") and name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def testTargetLines():
+    target = PingTarget("google", "8.8.8.8")
+    target.update([100.0, 10, 30, 20])
+    target.update(["Request timed out"])
+    lines = getExporter(target).render().decode("utf-8").splitlines()
+
+    assert 'pingcore_target_info{target="google",ip_address="8.8.8.8"} 1' in lines
+    assert 'pingcore_target_rtt_seconds_bucket{target="google",le="0.01"} 0' in lines
+    assert 'pingcore_target_rtt_seconds_bucket{target="google",le="0.02"} 1' in lines
+    assert 'pingcore_target_rtt_seconds_bucket{target="google",le="+Inf"} 1' in lines
+    assert 'pingcore_target_rtt_seconds_sum{target="google"} 0.020' in lines
+    assert 'pingcore_target_rtt_seconds_count{target="google"} 1' in lines
+    assert 'pingcore_target_probes_total{target="google"} 2' in lines
+    assert 'pingcore_target_lost_total{target="google"} 1' in lines
+    assert 'pingcore_target_loss_ratio{target="google"} 0.5' in lines
+
+
+def testFamiliesAreGrouped():
+    exporter = getExporter(PingTarget("a", "8.8.8.8"), PingTarget("b", "8.8.4.4"))
+    families = list()
+    for line in exporter.render().decode("utf-8").splitlines():
+        if line.startswith("# TYPE "):
+            families.append(line.split(" ")[2])
+        elif not line.startswith("#"):
+            assert familyOf(line) == families[-1]
+
+    assert len(families) == len(set(families))
+
+
+def testLinesFollowTheTarget():
+    target = PingTarget("google", "8.8.8.8")
+    exporter = getExporter(target)
+    assert b'pingcore_target_probes_total{target="google"} 0\n' in exporter.render()
+
+    target.update([100.0, 10, 30, 20])
+    assert b'pingcore_target_probes_total{target="google"} 1\n' in exporter.render()
+
+    target.reset()
+    assert b'pingcore_target_probes_total{target="google"} 0\n' in exporter.render()
+
+
+def testLabelsAreEscaped():
+    target = PingTarget('50% "loss"\\', "8.8.8.8")
+    target.update([100.0, 10, 30, 20])
+    body = getExporter(target).render().decode("utf-8")
+
+    assert 'pingcore_target_probes_total{target="50% \\"loss\\"\\\\"} 1\n' in body
+    assert 'pingcore_target_rtt_seconds_count{target="50% \\"loss\\"\\\\"} 1\n' in body
+
+
+def testServe():
+    exporter = getExporter(PingTarget("google", "8.8.8.8"))
+    exporter.port = 0
+    exporter.start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.port}/metrics") as response:
+            assert response.headers["Content-Type"] == MetricsExporter.CONTENT_TYPE
+            assert b'pingcore_target_probes_total{target="google"} 0\n' in response.read()
+    finally:
+        exporter.stop()
+
+
+def testNames():
+    monitor = Monitor()
+    monitor.addTarget(PingTarget(0, "8.8.8.8"))
+    body = MetricsExporter(monitor, names={0: "Google DNS"}.get).render()
+
+    assert b'pingcore_target_info{target="Google DNS",ip_address="8.8.8.8"} 1\n' in body
+    assert b'pingcore_target_probes_total{target="Google DNS"} 0\n' in body
+    assert b'target="0"' not in body
@@ -0,0 +1,85 @@
+from pingcore import LatencyHistory
+
+import random
+import math
+
+
+def bruteForce(samples, start, end):
+    rtts = [rtt for _, rtt in samples[start:end]]
+    kept = [rtt for rtt in rtts if rtt is not None]
+    return (min(kept, default=math.inf), max(kept, default=-math.inf), len(rtts) - len(kept))
+
+
+def fill(count, seed=1):
+    generator = random.Random(seed)
+    history = LatencyHistory()
+    samples = [(n * 0.5, None if generator.random() < 0.05 else float(generator.randint(1, 500))) for n in range(count)]
+    for timestamp, rtt in samples:
+        history.append(timestamp, rtt)
+    return history, samples
+
+
+def testEmpty():
+    history = LatencyHistory()
+    assert len(history) == 0
+    assert history.columns(0, 10, 5) == [None] * 5
+    assert history.rangeMinMax(0, 0) == (math.inf, -math.inf, 0)
+
+
+def testLevelsAreCreatedLazily():
+    history = LatencyHistory()
+    history.append(0, 10)
+    assert len(history.levels) == 0
+    history.append(1, 20)
+    assert len(history.levels) == 1
+    for n in range(2, 9):
+        history.append(n, 30)
+    assert len(history.levels) == 2
+
+
+def testRangeMinMax():
+    history, samples = fill(LatencyHistory.LIMIT)
+    generator = random.Random(2)
+    for _ in range(200):
+        start = generator.randrange(len(samples))
+        end = generator.randrange(start, len(samples) + 1)
+        assert history.rangeMinMax(start, end) == bruteForce(samples, start, end)
+
+
+def testColumns():
+    history, samples = fill(LatencyHistory.LIMIT)
+    width = 37
+    t1 = samples[-1][0] + 0.5
+    columns = history.columns(0, t1, width)
+
+    step = t1 / width
+    for column, result in enumerate(columns):
+        inColumn = [n for n, (timestamp, _) in enumerate(samples) if column * step <= timestamp < (column + 1) * step]
+        assert result == bruteForce(samples, inColumn[0], inColumn[-1] + 1)
+
+
+def testRetention():
+    count = LatencyHistory.LIMIT * LatencyHistory.FACTOR ** 2
+    history, samples = fill(count)
+    assert len(history) == count
+
+    limit = LatencyHistory.LIMIT + LatencyHistory.LIMIT // LatencyHistory.FACTOR
+    assert len(history.times) <= limit
+    for level in history.levels[:-1]:
+        assert len(level.times) <= limit
+    assert history.base > 0
+
+    # Recent samples are exact
+    assert history.rangeMinMax(count - 100, count) == bruteForce(samples, count - 100, count)
+
+    # Older ones come from coarser buckets, which hold at least the samples asked for
+    low, high, lost = history.rangeMinMax(0, 1000)
+    expected = bruteForce(samples, 0, 1000)
+    assert low <= expected[0] and high >= expected[1] and lost >= expected[2]
+
+    # Every column of a chart over the whole history is filled
+    columns = history.columns(0, samples[-1][0] + 0.5, 800)
+    assert all(column is not None for column in columns)
+    overall = bruteForce(samples, 0, count)
+    assert min(column[0] for column in columns) == overall[0]
+    assert max(column[1] for column in columns) == overall[1]
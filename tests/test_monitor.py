@@ -0,0 +1,228 @@
+from pingcore import Monitor, PingTarget
+
+import threading
+import asyncio
+import time
+
+import pytest
+
+
+def fakeProbe(ip_address):
+    return [time.time(), 10, 30, 20]
+
+
+def collect(stream, count, timeout=5):
+    # Takes count results from a batched or unbatched stream
+    results = list()
+    deadline = time.monotonic() + timeout
+    for item in stream:
+        results.extend(item if isinstance(item, list) else [item])
+        if len(results) >= count or time.monotonic() > deadline:
+            break
+    return results
+
+
+def newMonitor(count=3, **options):
+    monitor = Monitor(interval=0.01, probe=fakeProbe, **options)
+    for n in range(count):
+        monitor.addTarget(f"10.0.0.{n + 1}")
+    return monitor
+
+
+def testStreamEndsOnStop():
+    monitor = newMonitor()
+    stream = monitor.stream()
+    monitor.start()
+    results = collect(stream, 30)
+    monitor.stop()
+
+    assert {result.key for result in results} == {"10.0.0.1", "10.0.0.2", "10.0.0.3"}
+    assert all(result.rtt == 20 and result.error is None for result in results)
+    list(stream)    # ends once the pings in progress were delivered
+    monitor.join()
+    assert monitor.activeWorkerCount() == 0
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def testBatches(concurrent):
+    monitor = newMonitor(5, concurrent=concurrent)
+    stream = monitor.stream(batchSize=4, maxDelay=0.05)
+    monitor.start()
+    batches = [next(stream) for _ in range(10)]
+    monitor.stop()
+
+    assert all(1 <= len(batch) <= 4 for batch in batches)
+
+
+def testRestart():
+    monitor = newMonitor()
+    monitor.start()
+    monitor.stop()
+    monitor.join()
+
+    # Subscribing while stopped gets the results of the next run
+    stream = monitor.stream()
+    monitor.start()
+    assert len(collect(stream, 10)) == 10
+    monitor.stop()
+    list(stream)
+    monitor.join()
+
+
+def testSubscribeWhileStopping():
+    release = threading.Event()
+
+    def blockingProbe(ip_address):
+        release.wait()
+        return fakeProbe(ip_address)
+
+    monitor = Monitor(interval=0.01, probe=blockingProbe)
+    monitor.addTarget("10.0.0.1")
+    first = monitor.stream()
+    monitor.start()
+    time.sleep(0.05)
+    monitor.stop()
+
+    second = monitor.stream()
+    with pytest.raises(RuntimeError):
+        monitor.start()
+
+    release.set()
+    monitor.join()
+    assert len(list(first)) == 1
+    assert not second.closed
+
+    monitor.start()
+    assert len(collect(second, 3)) == 3
+    monitor.stop()
+    monitor.join()
+
+
+def testAddAndRemoveWhileRunning():
+    monitor = newMonitor(1)
+    stream = monitor.stream()
+    monitor.start()
+    collect(stream, 2)
+
+    monitor.addTarget("10.0.0.2", key="second")
+    assert any(result.key == "second" for result in collect(stream, 20))
+
+    removed = monitor.removeTarget("10.0.0.1")
+    assert isinstance(removed, PingTarget)
+    collect(stream, 5)      # pings already in progress may still come in
+    assert all(result.key == "second" for result in collect(stream, 10))
+
+    monitor.stop()
+    monitor.join()
+
+
+def testAddAgainWhileRunning():
+    pinging = set()
+    overlaps = list()
+    lock = threading.Lock()
+
+    def probe(ip_address):
+        # Records a target pinged by two workers at once
+        with lock:
+            if ip_address in pinging:
+                overlaps.append(ip_address)
+            pinging.add(ip_address)
+        time.sleep(0.002)
+        with lock:
+            pinging.discard(ip_address)
+        return [time.time(), 10, 30, 20]
+
+    monitor = Monitor(interval=0.01, probe=probe)
+    for n in range(3):
+        monitor.addTarget(f"10.0.0.{n + 1}")
+    monitor.start()
+
+    # Removed and added again, while pinged or waiting for its next ping
+    for _ in range(50):
+        monitor.addTarget(monitor.removeTarget("10.0.0.1"))
+        time.sleep(0.001)
+    time.sleep(0.05)
+
+    stream = monitor.stream()
+    results = collect(stream, 60)
+    monitor.stop()
+    monitor.join()
+    stream.close()
+
+    counts = {key: sum(1 for result in results if result.key == key) for key in monitor.targets}
+    assert counts["10.0.0.1"] <= counts["10.0.0.2"] + 2
+    assert overlaps == []
+
+
+def testDuplicateKey():
+    monitor = newMonitor(1)
+    with pytest.raises(ValueError):
+        monitor.addTarget("10.0.0.1")
+
+
+def testInvalidTargetReportsOneError():
+    monitor = Monitor(interval=0.01, probe=fakeProbe)
+    monitor.addTarget("not-an-ip", key="bad")
+    monitor.addTarget("10.0.0.1", key="good")
+    stream = monitor.stream()
+    monitor.start()
+    results = collect(stream, 20)
+    monitor.stop()
+    monitor.join()
+
+    errors = [result for result in results if result.error is not None]
+    assert [result.key for result in errors] == ["bad"]
+    assert isinstance(errors[0].error, ValueError)
+    assert not monitor.targets["bad"].enabled
+
+
+def testAsyncBatches():
+    monitor = newMonitor(4)
+
+    async def consume():
+        received = 0
+        async for batch in monitor.stream(batchSize=100, maxDelay=0.02):
+            assert isinstance(batch, list)
+            received += len(batch)
+            if received >= 50:
+                monitor.stop()
+        return received
+
+    monitor.start()
+    assert asyncio.run(asyncio.wait_for(consume(), 10)) >= 50
+    monitor.join()
+
+
+def testStatistics():
+    monitor = newMonitor(2)
+    stream = monitor.stream()
+    monitor.start()
+    collect(stream, 10)
+    monitor.stop()
+    monitor.join()
+
+    statistics = monitor.statistics()
+    assert statistics["dispatched"] >= 10
+    assert statistics["activeWorkers"] == 0
+
+
+def testCancelledAsyncConsumerDoesNotStopWorkers():
+    monitor = newMonitor()
+    stream = monitor.stream()
+
+    async def consume():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), 0.001)
+
+    asyncio.run(consume())
+    monitor.start()
+    time.sleep(0.1)
+    monitor.stop()
+    monitor.join(2)
+
+    # A worker which died publishing would keep the Monitor stopping forever
+    assert monitor.activeWorkerCount() == 0
+    assert len(list(stream)) >= 3
+    monitor.start()
+    monitor.stop()
+    monitor.join()
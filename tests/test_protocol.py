@@ -0,0 +1,83 @@
+from pingcore import protocol, PingTarget
+
+import asyncio
+
+import pytest
+
+
+def readFrames(data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        frames = list()
+        while not reader.at_eof():
+            frames.append(await protocol.readFrame(reader))
+        return frames
+
+    return asyncio.run(read())
+
+
+def testFramesRoundTrip():
+    data = (protocol.helloFrame(2 ** 64 - 1, "paris")
+            + protocol.targetFrame(7, "Google DNS", "8.8.8.8")
+            + protocol.messageFrame(3, "Request timed out")
+            + protocol.welcomeFrame(42, 32)
+            + protocol.ackFrame(41))
+    (hello, target, message, welcome, ack) = readFrames(data)
+
+    assert hello[0] == protocol.HELLO and protocol.parseHello(hello[1]) == (2 ** 64 - 1, "paris")
+    assert target[0] == protocol.TARGET and protocol.parseTarget(target[1]) == (7, "Google DNS", "8.8.8.8")
+    assert message[0] == protocol.MESSAGE and protocol.parseMessage(message[1]) == (3, "Request timed out")
+    assert welcome == (protocol.WELCOME, protocol.WELCOME_PAYLOAD.pack(42, 32))
+    assert ack == (protocol.ACK, protocol.SEQUENCE.pack(41))
+
+
+def testResultsRoundTrip():
+    target = PingTarget("google", "8.8.8.8")
+    success = target.update([100.0, 10, 30, 20])
+    lost = target.update(["Request timed out"])
+    failed = PingTarget("bad", "not-an-ip").errorResult(ValueError("Invalid IP Address"))
+    records = (protocol.packRecord(1, 0, success)
+               + protocol.packRecord(1, 1, lost)
+               + protocol.packRecord(2, 2, failed))
+
+    payload = readFrames(protocol.encodeResults(5, records))[0][1]
+    targets = {1: ("google", "8.8.8.8"), 2: ("bad", "not-an-ip")}
+    messages = {1: "Request timed out", 2: "Invalid IP Address"}
+    sequence, (first, second, third) = protocol.decodeResults(payload, targets, messages, "paris")
+
+    assert sequence == 5
+    assert first == success._replace(agent="paris")
+    assert second == lost._replace(agent="paris")
+    assert (third.key, third.rtt, third.Min, third.lastResponseTime) == ("bad", None, None, None)
+    assert isinstance(third.error, protocol.RemoteError) and str(third.error) == "Invalid IP Address"
+
+
+def testInvalidResults():
+    record = protocol.packRecord(1, 0, PingTarget("google", "8.8.8.8").update([100.0, 10, 30, 20]))
+    payload = protocol.SEQUENCE.pack(1) + record
+
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decodeResults(payload[:-1], {1: ("google", "8.8.8.8")}, {}, "paris")
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decodeResults(payload, {}, {}, "paris")
+
+
+def testOversizedFrame():
+    with pytest.raises(protocol.ProtocolError):
+        readFrames(protocol.HEADER.pack(protocol.RESULTS, protocol.MAX_PAYLOAD + 1))
+
+
+@pytest.mark.parametrize("parse, payload", [
+    (protocol.parseHello, b"\x01\x02"),
+    (protocol.parseHello, protocol.SESSION.pack(1) + b"\xff"),
+    (protocol.parseTarget, protocol.TARGET_HEADER.pack(1, 10) + b"key"),
+    (protocol.parseTarget, protocol.TARGET_HEADER.pack(1, 1) + b"\xff8.8.8.8"),
+    (protocol.parseMessage, b""),
+    (protocol.parseWelcome, protocol.SEQUENCE.pack(1)),
+    (protocol.parseSequence, b"\x01"),
+])
+def testMalformedPayloads(parse, payload):
+    with pytest.raises(protocol.ProtocolError):
+        parse(payload)
@@ -0,0 +1,58 @@
+from pingcore import PingTarget
+from pingcore.snapshot import packSnapshot, writeSnapshot, readSnapshot, iterSnapshot, SnapshotError, HEADER
+
+import pytest
+import os
+
+
+def pingedTarget(key, ip_address, pings):
+    target = PingTarget(key, ip_address)
+    for n in range(pings):
+        target.update([1700000000.0 + n, 10, 30, 20] if n % 3 else ["Request timed out"])
+    return target
+
+
+def testRoundTrip(tmp_path):
+    targets = [pingedTarget(0, "8.8.8.8", 7), pingedTarget(1, "1.1.1.1", 0)]
+    path = os.path.join(tmp_path, "session.snapshot")
+    writeSnapshot(path, packSnapshot(targets, ["Google", "Cloudflare"]))
+
+    records = list(iterSnapshot(readSnapshot(path)))
+    assert [(name, ip_address) for name, ip_address, _ in records] == [("Google", "8.8.8.8"), ("Cloudflare", "1.1.1.1")]
+
+    for target, (_, _, state) in zip(targets, records):
+        restored = PingTarget(target.key, target.ip_address)
+        restored.restore(state)
+        for attribute in ("i", "Min", "Max", "Avg", "successBits", "historyLen", "lastResponseTime"):
+            assert getattr(restored, attribute) == getattr(target, attribute)
+
+
+def testNamesDefaultToKeys():
+    records = list(iterSnapshot(packSnapshot([pingedTarget("router", "10.0.0.1", 1)])))
+    assert records[0][:2] == ("router", "10.0.0.1")
+
+
+def testMissingSnapshot(tmp_path):
+    assert readSnapshot(os.path.join(tmp_path, "none")) is None
+
+
+def testTruncatedSnapshot():
+    data = packSnapshot([pingedTarget(0, "8.8.8.8", 3)])
+    with pytest.raises(SnapshotError):
+        list(iterSnapshot(data[:-4]))
+    with pytest.raises(SnapshotError):
+        list(iterSnapshot(data[:HEADER.size - 1]))
+
+
+def testCorruptSnapshot():
+    data = bytearray(packSnapshot([pingedTarget(0, "8.8.8.8", 3)], ["Google"]))
+    data[HEADER.size + 2] = 0xff    # first byte of the name
+    with pytest.raises(SnapshotError):
+        list(iterSnapshot(bytes(data)))
+
+
+def testUnsupportedVersion():
+    data = bytearray(packSnapshot([]))
+    data[4] = 1
+    with pytest.raises(SnapshotError):
+        list(iterSnapshot(bytes(data)))
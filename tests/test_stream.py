@@ -0,0 +1,90 @@
+from pingcore.stream import ResultPublisher
+
+import threading
+import asyncio
+import time
+
+import pytest
+
+
+def testPublishToEveryStream():
+    publisher = ResultPublisher()
+    first, second = publisher.stream(), publisher.stream(batchSize=10)
+    publisher.publish(1)
+    publisher.publishMany([2, 3])
+    publisher.closeStreams()
+
+    assert list(first) == [1, 2, 3]
+    assert list(second) == [[1, 2, 3]]
+    assert publisher.streams == []
+
+
+def testBoundedQueueDropsOldest():
+    publisher = ResultPublisher()
+    stream = publisher.stream(maxQueue=3)
+    publisher.publishMany([1, 2])
+    publisher.publishMany([3, 4, 5])
+    publisher.publish(6)
+    assert publisher.queuedResults() == 3
+    assert publisher.queueFill() == 1
+    publisher.closeStreams()
+
+    assert list(stream) == [4, 5, 6]
+    assert stream.dropped == 3
+
+
+def testBatchWaitsForMaxDelay():
+    publisher = ResultPublisher()
+    stream = publisher.stream(batchSize=100, maxDelay=0.1)
+    publisher.publish(1)
+    threading.Timer(0.03, publisher.publish, (2,)).start()
+
+    start = time.monotonic()
+    assert next(stream) == [1, 2]
+    assert time.monotonic() - start >= 0.09
+
+
+def testCloseUnsubscribes():
+    publisher = ResultPublisher()
+    with publisher.stream() as stream:
+        assert publisher.streams == [stream]
+    assert publisher.streams == []
+    assert list(stream) == []
+
+
+def testAsyncIterationFromAnotherThread():
+    publisher = ResultPublisher()
+    stream = publisher.stream(batchSize=5, maxDelay=0.01)
+
+    def produce():
+        for n in range(20):
+            publisher.publish(n)
+            time.sleep(0.001)
+        publisher.closeStreams()
+
+    async def consume():
+        received = list()
+        async for batch in stream:
+            assert len(batch) <= 5
+            received.extend(batch)
+        return received
+
+    threading.Thread(target=produce).start()
+    assert asyncio.run(asyncio.wait_for(consume(), 5)) == list(range(20))
+
+
+def testCancelledAsyncConsumer():
+    publisher = ResultPublisher()
+    stream = publisher.stream()
+
+    async def consume():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stream.__anext__(), 0.01)
+
+    # The consumer's loop is closed by the time the next result comes
+    asyncio.run(consume())
+    assert stream.waiters == []
+    publisher.publish(1)
+    publisher.closeStreams()
+
+    assert list(stream) == [1]
@@ -0,0 +1,60 @@
+from pingcore import PingTarget, LatencyHistory
+
+import threading
+import sys
+
+import pytest
+
+
+def testUpdate():
+    target = PingTarget("google", "8.8.8.8")
+    target.update([100.0, 10, 30, 20])
+    result = target.update(["Request timed out"])
+
+    assert (result.key, result.ip_address, result.rtt, result.message) == ("google", "8.8.8.8", None, "Request timed out")
+    assert (result.Min, result.Max, result.Avg) == (10, 30, 20)
+    assert result.successRate == 50
+    assert result.lastResponseTime == 100.0
+    assert (target.probes, target.lost, target.rttSum) == (2, 1, 20)
+    assert sum(target.rttCounts) == 1
+
+
+def testHistoryIsKeptOnlyWhenSet():
+    target = PingTarget(0, "8.8.8.8")
+    target.update([100.0, 10, 30, 20])
+    assert target.history is None
+
+    target.history = LatencyHistory()
+    target.update([101.0, 10, 30, 20])
+    target.reset()
+    assert len(target.history) == 0
+
+
+def testInvalidIPAddress():
+    with pytest.raises(ValueError):
+        PingTarget(0, "not-an-ip").isIPAddressValid()
+
+
+def testResetWhilePinging():
+    target = PingTarget(0, "8.8.8.8")
+    errors = list()
+    done = threading.Event()
+
+    def ping():
+        try:
+            for n in range(20000):
+                target.update([float(n), 10, 30, 20] if n % 4 else ["Request timed out"])
+        except Exception as error:
+            errors.append(error)
+        done.set()
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threading.Thread(target=ping).start()
+        while not done.is_set():
+            target.reset()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert errors == []
@@ -1,39 +1,99 @@
-from PySide6.QtWidgets import QTableView, QPushButton, QGridLayout, QWidget, QHeaderView, QSizePolicy, QMessageBox, QCheckBox, QApplication
+from PySide6.QtWidgets import QTableView, QPushButton, QGridLayout, QWidget, QHeaderView, QSizePolicy, QMessageBox, QCheckBox, QApplication, QSplitter
 from PySide6.QtGui import QStandardItemModel, QStandardItem, QColor
-from PySide6.QtCore import Slot, QThreadPool, Qt
+from PySide6.QtCore import Slot, QThreadPool, QTimer, Qt
 
-from concurrentpingthread import ConcurrentPingThread
-from intervalpingthread import IntervalPingThread
+from pingcore import Monitor, PingTarget, LatencyHistory, formatResponseTime
+from pingcore.snapshot import packSnapshot, readSnapshot, iterSnapshot, SnapshotError
+from pingcore.exporter import MetricsExporter
+from pingcore.collector import Collector
+from monitorbridge import MonitorBridge
 from exitprogresswindow import ExitProgressWindow
+from latencychart import LatencyChart
+from snapshotwriter import SnapshotWriter
 
 import os
 import json
 import time
+import sys
 
 
 class Window(QWidget):
     '''
     GUI window for Ping Tester
     Developed using PySide6 module (Qt 6 framework)
+
+    metricsPort: int
+        Port to serve Prometheus metrics on, None not to serve them
+
+    metricsHost: str
+        Address to serve Prometheus metrics on, e.g. 0.0.0.0 to be scraped from other machines
+
+    collectorPort: int
+        Port to collect the results of remote agents on, None not to collect them;
+        each target of each agent gets its own row, with the agent in the Agent column
+
+    collectorHost: str
+        Address to collect on, e.g. 0.0.0.0 for agents on other machines to connect
     '''
 
-    def __init__(self):
+    PING_INTERVAL = 0.5             # in seconds, between two pings of a target when pinging simultaneously
+    SNAPSHOT_INTERVAL = 30000       # in milliseconds
+    RESTORE_BATCH_SIZE = 500        # rows restored per event loop iteration
+
+    def __init__(self, metricsPort=None, collectorPort=None, metricsHost="127.0.0.1", collectorHost="127.0.0.1"):
         super().__init__()
         self.setWindowTitle("Ping Tester")
-        self.resize(800, 400)
+        self.resize(1200, 450)
 
         self.server_list = self.getServers()
+        self.targets = [PingTarget(row, server[1]) for row, server in enumerate(self.server_list)]
 
         self.activePingThreads = 0
-        self.pingThread_list = list()
+        self.monitor = None
+        self.bridge = None
         self.threadpool = QThreadPool()
 
+        # Session snapshots are written by a single background thread
+        self.snapshot_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "session.snapshot")
+        self.snapshotPool = QThreadPool()
+        self.snapshotPool.setMaxThreadCount(1)
+        self.snapshotTimer = QTimer(self)
+        self.snapshotTimer.timeout.connect(self.saveSnapshot)
+        self.snapshotTimer.start(self.SNAPSHOT_INTERVAL)
+        self.restoreRecords = None
+        self.restoreTargets = None
+
+        self.exporter = None
+        if metricsPort is not None:
+            # Targets are keyed by row; label their series with the server's name
+            self.exporter = MetricsExporter(host=metricsHost, port=metricsPort, names=lambda row: self.server_list[row][0])
+            self.exporter.start()
+
         self.initUI()
 
+        # Rows of the targets of remote agents, added as their first result comes in
+        self.remoteRows = dict()        # (agent, key) -> row
+        self.remoteTargets = dict()     # row -> PingTarget
+        self.collector = None
+        self.collectorBridge = None
+        # The collector's bridge runs until the collector stops, so it gets a thread of its own
+        # rather than one that the local bridge may need
+        self.collectorPool = QThreadPool()
+        self.collectorPool.setMaxThreadCount(1)
+        if collectorPort is not None:
+            self.collector = Collector(host=collectorHost, port=collectorPort)
+            self.collectorBridge = MonitorBridge(self.collector)
+            self.collectorBridge.signals.result.connect(self.update_remote_results)
+            self.collector.start()
+            self.collectorPool.start(self.collectorBridge)
+
         self.show()
 
         self.exit = False
 
+        # Restore the previous session once the window is up
+        QTimer.singleShot(0, self.restoreSnapshot)
+
     def initUI(self):
         layout = QGridLayout()
 
@@ -83,24 +143,34 @@ class Window(QWidget):
         buttonLayout.addWidget(self.resetButton, 1, 3, 2, 1)
 
         self.model = QStandardItemModel()
-        self.model.setHorizontalHeaderLabels(["Name", "IP Address", "Status", "Last Time\nResponse", "Current", "Min", "Max", "Avg"])
+        self.model.setHorizontalHeaderLabels(["Name", "IP Address", "Status", "Last Time\nResponse", "Current", "Min", "Max", "Avg", "Agent"])
         
         for server in self.server_list:
             name = QStandardItem(server[0])
             name.setCheckable(True)
-            self.model.appendRow([name, QStandardItem(server[1]), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem()])
+            self.model.appendRow([name, QStandardItem(server[1]), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem("local")])
         
         self.tableview = QTableView()
         self.tableview.setModel(self.model)
         self.tableview.setEditTriggers(QTableView.NoEditTriggers)
         self.tableview.setFocusPolicy(Qt.NoFocus)
-        self.tableview.setSelectionMode(QTableView.NoSelection)
+        self.tableview.setSelectionMode(QTableView.ExtendedSelection)
+        self.tableview.setSelectionBehavior(QTableView.SelectRows)
+        self.tableview.selectionModel().selectionChanged.connect(self.updateChart)
 
         header = self.tableview.horizontalHeader()
         for i in range(5, 8):
             header.setSectionResizeMode(i, QHeaderView.Stretch)
             
-        layout.addWidget(self.tableview, 1, 1)
+        # Round trip time chart of the selected rows
+        self.chart = LatencyChart()
+
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(self.tableview)
+        splitter.addWidget(self.chart)
+        splitter.setStretchFactor(0, 3)
+        splitter.setStretchFactor(1, 2)
+        layout.addWidget(splitter, 1, 1)
         
         self.setLayout(layout)
 
@@ -109,12 +179,6 @@ class Window(QWidget):
         self.infoMsgBox.setWindowTitle("Ping Tester - Info")
         self.infoMsgBox.setIcon(QMessageBox.Information)
         self.infoMsgBox.setStandardButtons(QMessageBox.Cancel)
-
-        # warning message box
-        self.warningMsgBox = QMessageBox()
-        self.warningMsgBox.setWindowTitle("Ping Tester - Warning")
-        self.warningMsgBox.setIcon(QMessageBox.Warning)
-        self.warningMsgBox.setStandardButtons(QMessageBox.Cancel)
     
     def getServers(self) -> dict:
         json_path = os.path.join(os.path.dirname(os.path.realpath(__file__)), "server_list.json")
@@ -147,110 +211,142 @@ class Window(QWidget):
             if self.model.item(row, 0).isCheckable() and self.model.item(row, 0).checkState() == Qt.CheckState.Checked:
                 self.model.item(row, 0).setCheckState(Qt.CheckState.Unchecked)
 
+    @Slot()
+    def updateChart(self):
+        rows = sorted(index.row() for index in self.tableview.selectionModel().selectedRows())
+        targets = [self.targetAt(row) for row in rows]
+
+        # Round trip times are only recorded from the first time a row is charted,
+        # since a history takes up to a few hundred KiB
+        for target in targets:
+            if target.history is None:
+                target.history = LatencyHistory()
+
+        self.chart.setTargets([(self.model.item(row, 0).text(), target) for row, target in zip(rows, targets)])
+
+    def targetAt(self, row):
+        if row < len(self.targets):
+            return self.targets[row]
+        return self.remoteTargets[row]
+
+    def remoteRow(self, result):
+        '''
+        Returns the row of a remote agent's target, added on its first result
+        '''
+        row = self.remoteRows.get((result.agent, result.key))
+        if row is not None:
+            return row
+
+        row = self.model.rowCount()
+        target = PingTarget(row, result.ip_address)
+        self.remoteRows[(result.agent, result.key)] = row
+        self.remoteTargets[row] = target
+        self.model.appendRow([QStandardItem(str(result.key)), QStandardItem(result.ip_address), QStandardItem(), QStandardItem(),
+                              QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(), QStandardItem(result.agent)])
+        return row
+
+    def saveSnapshot(self):
+        names = [server[0] for server in self.server_list]
+        self.snapshotPool.start(SnapshotWriter(self.snapshot_path, packSnapshot(self.targets, names)))
+
+    def restoreSnapshot(self):
+        data = readSnapshot(self.snapshot_path)
+        if data is None:
+            return
+
+        # Records are only restored to rows of the same name and IP Address,
+        # in order when several rows share both
+        self.restoreTargets = dict()
+        for server, target in zip(self.server_list, self.targets):
+            self.restoreTargets.setdefault((server[0], target.ip_address), []).append(target)
+
+        self.restoreRecords = iterSnapshot(data)
+        self.restoreBatch()
+
+    def restoreBatch(self, batchSize=RESTORE_BATCH_SIZE):
+        if self.restoreRecords is None:
+            return
+
+        try:
+            for _ in range(batchSize):
+                name, ip_address, state = next(self.restoreRecords)
+                targets = self.restoreTargets.get((name, ip_address))
+                if targets:
+                    target = targets.pop(0)
+                    target.restore(state)
+                    self.showRestoredTarget(target)
+        except (StopIteration, SnapshotError):
+            self.restoreRecords = None
+            return
+
+        QTimer.singleShot(0, self.restoreBatch)
+
+    def finishRestore(self):
+        if self.restoreRecords is not None:
+            self.restoreBatch(batchSize=sys.maxsize)
+
+    def showRestoredTarget(self, target):
+        # Last Time Response
+        self.model.item(target.key, 3).setText(formatResponseTime(target.lastResponseTime))
+
+        if target.i > 0:
+            # Min, Max, Avg
+            self.model.item(target.key, 5).setText(f"{target.Min} ms")
+            self.model.item(target.key, 6).setText(f"{target.Max} ms")
+            self.model.item(target.key, 7).setText(f"{target.Avg} ms")
+
     @Slot()
     def start(self):
+        self.finishRestore()
         self.startButton.setEnabled(False)
         self.simultaneousCheckBox.setEnabled(False)
-        if self.simultaneousCheckBox.isChecked():
-            self.simultaneousPing()
-        else:
-            self.intervalPing()
 
-    def simultaneousPing(self):
-        for row, server in enumerate(self.server_list):
+        simultaneous = self.simultaneousCheckBox.isChecked()
+        monitor = Monitor(interval=self.PING_INTERVAL if simultaneous else 0, concurrent=simultaneous)
+        for row, target in enumerate(self.targets):
             if self.model.item(row, 0).checkState() == Qt.CheckState.Checked:
                 self.model.item(row, 0).setCheckable(False)
+                monitor.addTarget(target)
 
-                ip_address = server[1]
-                t = ConcurrentPingThread(row, ip_address)
-                t.signals.started.connect(self.on_start)
-                t.signals.result.connect(self.update_result)
-                t.signals.error.connect(self.on_error)
-                t.signals.finished.connect(self.on_finished)
-
-                self.pingThread_list.append(t)
-
-        if len(self.pingThread_list) == 0:
+        if len(monitor.targets) == 0:
             self.infoMsgBox.setText(f"No IP address has been selected")
             self.infoMsgBox.setInformativeText("Select an IP address by ticking the checkbox beside its name")
             self.infoMsgBox.exec()
             self.startButton.setEnabled(True)
             self.simultaneousCheckBox.setEnabled(True)
             return
-        
-        if len(self.pingThread_list) > self.threadpool.maxThreadCount():
-            self.warningMsgBox.setText(f"Up to a maximum of {self.threadpool.maxThreadCount()} IP address can be simultaneously tested")
-            self.warningMsgBox.setInformativeText(f"{len(self.pingThread_list)} IP address have been selected")
-            self.warningMsgBox.exec()
-            for pingThread in self.pingThread_list:
-                self.model.item(pingThread.row, 0).setCheckable(True)
-            del self.pingThread_list[:]
-            self.startButton.setEnabled(True)
-            self.simultaneousCheckBox.setEnabled(True)
-            return
 
-        for thread in self.pingThread_list:
-            self.threadpool.start(thread)
+        self.bridge = MonitorBridge(monitor)
+        self.bridge.signals.started.connect(self.on_start)
+        self.bridge.signals.result.connect(self.update_results)
+        self.bridge.signals.error.connect(self.on_error)
+        self.bridge.signals.finished.connect(self.on_finished)
+
+        self.monitor = monitor
+        if self.exporter is not None:
+            self.exporter.monitor = monitor
+        self.threadpool.start(self.bridge)
+        self.monitor.start()
 
-    def intervalPing(self):
-        rowIP_pairs = list()
-        for row, server in enumerate(self.server_list):
-            if self.model.item(row, 0).checkState() == Qt.CheckState.Checked:
-                self.model.item(row, 0).setCheckable(False)
-                ip_address = server[1]
-                rowIP_pairs.append((row, ip_address))
-
-        if len(rowIP_pairs) > 0:
-            t = IntervalPingThread(rowIP_pairs)
-            t.signals.started.connect(self.on_start)
-            t.signals.result.connect(self.update_result)
-            t.signals.error.connect(self.on_error)
-            t.signals.finished.connect(self.on_finished)
-
-            self.pingThread_list.append(t)
-            self.threadpool.start(t)
-        else:
-            self.infoMsgBox.setText(f"No IP address has been selected")
-            self.infoMsgBox.setInformativeText("Select an IP address by ticking the checkbox beside its name")
-            self.infoMsgBox.exec()
-            self.startButton.setEnabled(True)
-            self.simultaneousCheckBox.setEnabled(True)
-            
     @Slot()
     def stop(self):
-        if len(self.pingThread_list) == 0:
+        if self.monitor is None:
             return
 
-        for pingThread in self.pingThread_list:
-            if pingThread.enabled:
-                pingThread.enabled = False
+        self.monitor.stop()
 
     @Slot()
     def reset(self):
-        try:
-            # Reset during interval ping
-            for pingTest in self.pingThread_list[0].pingTests:
-                del pingTest.successQueue[:]
-                pingTest.i = 0
-                pingTest.lastResponseTime = ""
-                pingTest.Min = None
-                pingTest.Max = None
-                pingTest.Avg = 0
-        except IndexError:
-            # Reset when there is no ping
-            pass
-        except AttributeError:
-            # Reset during simultaneous ping
-            for pingThread in self.pingThread_list:
-                del pingThread.successQueue[:]
-                pingThread.i = 0
-                pingThread.lastResponseTime = ""
-                pingThread.Min = None
-                pingThread.Max = None
-                pingThread.Avg = 0
+        # Discard any statistics still being restored from the last session
+        self.restoreRecords = None
+
+        for target in self.targets:
+            target.reset()
+        for target in self.remoteTargets.values():
+            target.reset()
 
         for row in range(self.model.rowCount()):
-            if self.model.item(row, 2).text() == "Error, see Current" and self.activePingThreads > 0:
+            if self.model.item(row, 2).text() == "Error, see Current" and self.monitor is not None:
                 for i in range(5, 8):
                     self.model.item(row, i).setText("")
             else:
@@ -263,41 +359,64 @@ class Window(QWidget):
         self.activePingThreads += 1
 
     @Slot()
-    def on_error(self, error):
-        self.model.item(error[0], 2).setText("Error, see Current")
-        self.model.item(error[0], 2).setBackground(QColor("red"))
-        self.model.item(error[0], 4).setText(str(error[2]))
-    
+    def on_error(self, result):
+        self.show_error(result.key, result)
+
+    def show_error(self, row, result):
+        self.model.item(row, 2).setText("Error, see Current")
+        self.model.item(row, 2).setBackground(QColor("red"))
+        self.model.item(row, 4).setText(result.message)
+
+    @Slot()
+    def update_results(self, results):
+        for result in results:
+            if result.error is None:
+                self.update_result(result.key, result)
+
     @Slot()
-    def update_result(self, result):
-        status = f"{result[1]} %"
-        if self.model.item(result[0], 2).text() != status:
+    def update_remote_results(self, results):
+        for result in results:
+            row = self.remoteRow(result)
+            if result.error is not None:
+                self.show_error(row, result)
+                continue
+
+            # Remote statistics arrive ready-made; only the chart's history is kept here
+            history = self.remoteTargets[row].history
+            if history is not None:
+                history.append(result.timestamp, result.rtt)
+            self.update_result(row, result)
+
+    def update_result(self, row, result):
+        status = f"{result.successRate} %"
+        if self.model.item(row, 2).text() != status:
             # Status
-            self.model.item(result[0], 2).setText(status)
+            self.model.item(row, 2).setText(status)
         
-            if result[1] >= 90:
-                self.model.item(result[0], 2).setBackground(QColor(0, 153, 0))
-            elif result[1] >= 70:
-                self.model.item(result[0], 2).setBackground(QColor(102, 204, 0))
-            elif result[1] >= 20:
-                self.model.item(result[0], 2).setBackground(QColor("yellow"))
+            if result.successRate >= 90:
+                self.model.item(row, 2).setBackground(QColor(0, 153, 0))
+            elif result.successRate >= 70:
+                self.model.item(row, 2).setBackground(QColor(102, 204, 0))
+            elif result.successRate >= 20:
+                self.model.item(row, 2).setBackground(QColor("yellow"))
             else:
-                self.model.item(result[0], 2).setBackground(QColor("red"))
+                self.model.item(row, 2).setBackground(QColor("red"))
 
         # Last Time Response
-        self.model.item(result[0], 3).setText(result[2])
+        self.model.item(row, 3).setText(formatResponseTime(result.lastResponseTime))
 
         # Current
-        self.model.item(result[0], 4).setText(result[3][0])
+        self.model.item(row, 4).setText(f"{result.rtt} ms" if result.rtt is not None else result.message)
 
-        # Min
-        self.model.item(result[0], 5).setText(result[3][1])
+        if result.Min is not None:
+            # Min
+            self.model.item(row, 5).setText(f"{result.Min} ms")
 
-        # Max
-        self.model.item(result[0], 6).setText(result[3][2])
+            # Max
+            self.model.item(row, 6).setText(f"{result.Max} ms")
 
-        # Avg
-        self.model.item(result[0], 7).setText(result[3][3])
+            # Avg
+            self.model.item(row, 7).setText(f"{result.Avg} ms")
 
     @Slot()
     def on_finished(self):
@@ -305,22 +424,15 @@ class Window(QWidget):
         if self.activePingThreads > 0:
             return
         
-        if self.simultaneousCheckBox.isChecked():    
-            for pingThread in self.pingThread_list:
-                self.model.item(pingThread.row, 0).setCheckable(True)
-                if self.model.item(pingThread.row, 2).text() != "Error, see Current":
-                    self.model.item(pingThread.row, 2).setText("")
-                    self.model.item(pingThread.row, 2).setBackground(self.model.item(pingThread.row, 1).background())
-                    self.model.item(pingThread.row, 4).setText("")
-        else:
-            for pingTest in self.pingThread_list[0].pingTests:
-                self.model.item(pingTest.row, 0).setCheckable(True)
-                if self.model.item(pingTest.row, 2).text() != "Error, see Current":
-                    self.model.item(pingTest.row, 2).setText("")
-                    self.model.item(pingTest.row, 2).setBackground(self.model.item(pingTest.row, 1).background())
-                    self.model.item(pingTest.row, 4).setText("")
-
-        del self.pingThread_list[:]
+        for row in self.monitor.targets:
+            self.model.item(row, 0).setCheckable(True)
+            if self.model.item(row, 2).text() != "Error, see Current":
+                self.model.item(row, 2).setText("")
+                self.model.item(row, 2).setBackground(self.model.item(row, 1).background())
+                self.model.item(row, 4).setText("")
+
+        self.monitor = None
+        self.bridge = None
         self.startButton.setEnabled(True)
         self.simultaneousCheckBox.setEnabled(True)
             
@@ -328,14 +440,15 @@ class Window(QWidget):
         self.exitProgressWindow.show()
         self.exitProgressWindow.raise_()
 
-        if self.activePingThreads == 0:
+        activeWorkers = 0 if self.monitor is None else self.monitor.activeWorkerCount()
+        if activeWorkers == 0:
             self.exitProgressWindow.progressBar.setMinimum(-1)
             self.exitProgressWindow.progressBar.setValue(-1)
         else:
             self.exitProgressWindow.progressBar.setMinimum(0)
             self.exitProgressWindow.progressBar.setValue(0)
 
-        self.exitProgressWindow.progressBar.setMaximum(self.activePingThreads)
+        self.exitProgressWindow.progressBar.setMaximum(activeWorkers)
 
     def closeEvent(self, event):
         if self.exit:
@@ -344,22 +457,35 @@ class Window(QWidget):
         self.exit = True
         self.launchExitProgress()
 
-        for pingThread in self.pingThread_list:
-            if pingThread.enabled:
-                pingThread.enabled = False
+        if self.monitor is not None:
+            self.monitor.stop()
 
-        activeThreadCount = self.threadpool.activeThreadCount()
-        while activeThreadCount >= 0:
-            killedThreadCount = self.exitProgressWindow.progressBar.maximum() - activeThreadCount
-            if killedThreadCount > self.exitProgressWindow.progressBar.value():
-                self.exitProgressWindow.progressBar.setValue(killedThreadCount)
-                QApplication.processEvents()
-                
-            if activeThreadCount == 0:
-                time.sleep(0.3)
-                break
+            activeWorkers = self.monitor.activeWorkerCount()
+            while activeWorkers >= 0:
+                stoppedWorkers = self.exitProgressWindow.progressBar.maximum() - activeWorkers
+                if stoppedWorkers > self.exitProgressWindow.progressBar.value():
+                    self.exitProgressWindow.progressBar.setValue(stoppedWorkers)
+                    QApplication.processEvents()
+
+                if activeWorkers == 0:
+                    time.sleep(0.3)
+                    break
+
+                time.sleep(0.01)
+                activeWorkers = self.monitor.activeWorkerCount()
+
+        if self.collector is not None:
+            self.collector.stop()
+            self.collectorPool.waitForDone(1000)
 
-            activeThreadCount = self.threadpool.activeThreadCount()
-        
         self.threadpool.waitForDone(1000)
+
+        if self.exporter is not None:
+            self.exporter.stop()
+
+        self.finishRestore()
+        self.snapshotTimer.stop()
+        self.saveSnapshot()
+        self.snapshotPool.waitForDone()
+
         super().closeEvent(event)